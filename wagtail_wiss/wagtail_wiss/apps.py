@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class WagtailWissConfig(AppConfig):
+    name = "wagtail_wiss"
+    label = "wagtail_wiss"
+    verbose_name = "WiSS"
+
+    def ready(self):
+        # Connect signal handlers
+        from . import signals  # noqa: F401
@@ -1,16 +1,14 @@
 # from pyparsing import null_debug_action
-import os
+import functools
 import re
 import uuid
 import json
-from bs4 import BeautifulSoup
-from dateutil.parser import parse as parse_date
 
-from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils.functional import lazy
 from django.utils.html import strip_tags
-from django.utils.safestring import mark_safe
+from django.utils.safestring import SafeString, mark_safe
 from django.utils import timezone
 from django.template import loader, TemplateDoesNotExist
 from django.template.loader import select_template
@@ -35,9 +33,14 @@ from wagtail.templatetags.wagtailcore_tags import richtext
 from wagtail.embeds.blocks import EmbedBlock
 
 from .shared_utils.doc_helpers import get_file_marker_html
-from .shared_utils.accessibility import ParagraphBlock
-
-from .shared_utils.style_helpers import get_class_choices_from_scss
+from .shared_utils.accessibility import AccessibleRichTextBlock, ParagraphBlock
+from .shared_utils.cache_variance import (
+    CacheVarianceMixin,
+    is_deterministic,
+    stable_dom_id,
+)
+
+from .shared_utils.style_helpers import styled_paragraph_class_choices
 from .widgets import CaptionWithOCRWidget
 
 
@@ -148,7 +151,8 @@ class AccordianBlock(blocks.StructBlock):
         get_context(value, parent_context=None):
             Extends the block's context by adding a unique identifier (`id`)
             to ensure each block instance can be uniquely identified in the
-            rendered HTML.
+            rendered HTML. With `WISS_DETERMINISTIC_RENDERING` enabled the id is
+            derived from the StreamField block id instead of being random.
     """
 
     # heading = blocks.TextBlock(max_length=100, blank=True, null=True, required=False)
@@ -163,9 +167,51 @@ class AccordianBlock(blocks.StructBlock):
     # Update your block definition to include a unique ID in the context:
     def get_context(self, value, parent_context=None):
         context = super().get_context(value, parent_context)
-        context["id"] = str(uuid.uuid4())  # Unique ID for each block
+        if is_deterministic():
+            context["id"] = self.get_stable_id(value, parent_context)
+        else:
+            context["id"] = str(uuid.uuid4())  # Unique ID for each block
         return context
 
+    def get_stable_id(self, value, parent_context=None):
+        """
+        Derive the accordion's DOM id from its StreamField block id, so the same
+        accordion renders the same markup every time.
+
+        The block id is found on the bound block in the parent context, e.g. `block`
+        in `{% for block in page.body %}{% include_block block %}`. Without one the
+        ids of the items are used, and for legacy data with no ids the item titles;
+        those can repeat on a page, so a repeat within the request gets a counter.
+        """
+        parent_context = parent_context or {}
+        for candidate in parent_context.values():
+            if (
+                isinstance(candidate, blocks.BoundBlock)
+                and candidate.value is value
+                and getattr(candidate, "id", None)
+            ):
+                return stable_dom_id(candidate.id)
+
+        items = value["accordian_items"]
+        item_ids = [child.original_id for child in getattr(items, "bound_blocks", [])]
+        if item_ids and all(item_ids):
+            dom_id = stable_dom_id(*item_ids)
+        else:
+            dom_id = stable_dom_id(*(item["title"] for item in items))
+        return self.deduplicate_id(dom_id, parent_context.get("request"))
+
+    @staticmethod
+    def deduplicate_id(dom_id, request):
+        """
+        Suffix `dom_id` with a counter if it was already used in this request.
+        """
+        if request is None:
+            return dom_id
+        used = request.__dict__.setdefault("_wiss_accordion_ids", {})
+        count = used.get(dom_id, 0) + 1
+        used[dom_id] = count
+        return dom_id if count == 1 else f"{dom_id}-{count}"
+
 
 ### End Accordion block
 
@@ -180,8 +226,8 @@ class StyledRichTextBlock(blocks.StructBlock):
         css_class (blocks.ChoiceBlock): A dropdown for selecting an optional CSS class
             from a list of choices derived from a SCSS file. This allows for applying
             specific styles to the block.
-        content (blocks.RichTextBlock): A rich text editor block that supports a predefined
-            set of features specified by `RICH_TEXT_FEATURES`.
+        content (AccessibleRichTextBlock): A rich text editor block that supports a predefined
+            set of features specified by `RICH_TEXT_FEATURES`, with link accessibility markers.
 
     Meta:
         icon (str): The icon used to represent this block in the Wagtail admin interface.
@@ -189,29 +235,34 @@ class StyledRichTextBlock(blocks.StructBlock):
         template (str): The path to the template used to render this block.
     """
 
+    # Resolved when the admin form is built, not when this module is imported
     css_class = blocks.ChoiceBlock(
-        choices=get_class_choices_from_scss(
-            os.path.join(
-                settings.BASE_DIR,
-                "home",
-                "static",
-                "css",
-                "components",
-                "_accessible-colour-palette.scss",
-            )
-        ),
+        choices=styled_paragraph_class_choices,
         required=False,
         label="CSS class",
         help_text="Select an optional CSS style for this block.",
     )
 
-    content = blocks.RichTextBlock(features=RICH_TEXT_FEATURES)
+    content = AccessibleRichTextBlock(features=RICH_TEXT_FEATURES)
 
     class Meta:
         icon = "doc-full"
         label = "Styled paragraph"
         template = "blocks/styled_richtext_block.html"
 
+    def get_context(self, value, parent_context=None):
+        context = super().get_context(value, parent_context)
+        # Render the content through its block so link markers (or the output stored
+        # at publish time) are applied; templates should output `content_html`. It is
+        # only rendered if the template uses it, and then once.
+        render_content = functools.lru_cache(maxsize=None)(
+            functools.partial(
+                self.child_blocks["content"].render, value["content"], parent_context
+            )
+        )
+        context["content_html"] = lazy(render_content, SafeString)()
+        return context
+
 
 # class ContentGridBlock(ClusterableModel):
 #     title = models.CharField(max_length=255)
@@ -560,14 +611,12 @@ class SiteMapBlock(blocks.StructBlock):
     #     return loader.render_to_string(template_name, context)
 
 
-class NewsBlock(blocks.StructBlock):
+class NewsBlock(CacheVarianceMixin, blocks.StructBlock):
     category = SnippetChooserBlock(Category, required=False)
 
-    def get_context(self, value, parent_context=None):
-        context = super().get_context(value, parent_context)
-
+    def get_news_items(self, value, now=None):
         # Get current time
-        now = timezone.now()
+        now = now or timezone.now()
 
         # Base query: Only include news items that are NOT archived and NOT expired
         news_items = NewsItem.objects.filter(archive=False).filter(
@@ -578,11 +627,26 @@ class NewsBlock(blocks.StructBlock):
         if value["category"]:
             news_items = news_items.filter(category=value["category"])
 
+        return news_items
+
+    def get_context(self, value, parent_context=None):
+        context = super().get_context(value, parent_context)
+
         # Order by published date (newest first)
-        context["news_items"] = news_items.order_by("sort_order", "-published_at")
+        context["news_items"] = self.get_news_items(value).order_by(
+            "sort_order", "-published_at"
+        )
 
         return context
 
+    def get_cache_expiry(self, value):
+        """
+        The output changes when the next listed item expires.
+        """
+        return self.get_news_items(value).aggregate(
+            next_expiry=models.Min("expiry_date")
+        )["next_expiry"]
+
     class Meta:
         icon = "snippet"
         label = "News"
@@ -1,54 +1,73 @@
-import math
-import re
+import hashlib
+import json
 
-from math import radians, cos, sin, asin, sqrt
+from datetime import datetime, time, timedelta
 
-from dateutil.parser import parse as parse_date
-from pagination.utils import paginate
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Prefetch
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+from django.utils.http import urlencode
 
-from shared_utils.accessibility import ParagraphBlock
+from wagtail_wiss.pagination.utils import keyset_paginate, paginate
+from wagtail_wiss.shared_utils.accessibility import ParagraphBlock
+from wagtail_wiss.shared_utils.cache_variance import CacheVarianceMixin
 
 from wagtail import blocks
 from wagtail.models import Locale
 from wagtail.snippets.blocks import SnippetChooserBlock
 
-from .models import Event, EventArea, EventsCategory, Label
+from . import geo
+from .catalogues import get_areas, get_labels, translate_areas, translate_categories
+from .models import Event, EventDateInstance, EventsCategory
+from .renditions import get_listing_images
+
+
+class EventsBlock(CacheVarianceMixin, blocks.StructBlock):
+    # The filter form and pagination are driven by these query string parameters
+    cache_vary_params = (
+        "start_date",
+        "end_date",
+        "areas",
+        "near",
+        "radius",
+        "page",
+        "cursor",
+    )
+    cache_vary_locale = True
 
-def haversine(lat1, lon1, lat2, lon2):
-        # Convert decimal degrees to radians
-        lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    # How many upcoming dates are listed for each event
+    upcoming_dates_limit = 10
 
-        # Haversine formula
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * asin(sqrt(a))
-        r = 3956  # Radius of Earth in miles. Use 6371 for km
-        rk =6371
-        m=math.ceil(c*r)
-        km=math.ceil(c*rk)
-        return m, km  # return both miles and km
+    # The radii, in kilometres, offered alongside "near me"
+    radius_choices = (5, 10, 25, 50, 100)
 
-class EventsBlock(blocks.StructBlock):
     ### From Event snippets
     categories = blocks.ListBlock(
         SnippetChooserBlock(EventsCategory, required=False), required=False
     )
 
     @staticmethod
-    def parse_wkt_point(wkt):
+    def get_count_cache_key(
+        locale, categories, start_date, end_date, areas, near=None, radius=None
+    ):
         """
-        Extracts lat/lng from 'SRID=4326;POINT(lng lat)' format.
-        Returns a tuple (lat, lng) or None if invalid.
+        Build the cache key for the approximate result count of one filter combination.
         """
-        match = re.search(r"POINT\(([-\d.]+) ([-\d.]+)\)", wkt)
-        if match:
-            lng = float(match.group(1))
-            lat = float(match.group(2))
-            return lat, lng
-        return None
-    
-    
+        filters = json.dumps(
+            [
+                locale.pk,
+                sorted(category.pk for category in categories),
+                start_date,
+                end_date,
+                sorted(area.pk for area in areas),
+                near,
+                radius,
+            ],
+            cls=DjangoJSONEncoder,
+        )
+        return f"wiss:events:count:{hashlib.sha256(filters.encode('utf-8')).hexdigest()}"
 
     def get_selected_categories(self, value):
         """
@@ -59,6 +78,32 @@ class EventsBlock(blocks.StructBlock):
             category for category in value.get("categories", []) if category is not None
         ]
 
+    @staticmethod
+    def get_geojson_url(
+        language_code, categories, start_date, end_date, areas, near=None, radius=None
+    ):
+        """
+        Return the URL of the map's GeoJSON feed for these filters, without the
+        viewport, or None if the events URLs are not installed.
+        """
+        try:
+            url = reverse("events_geojson")
+        except NoReverseMatch:
+            return None
+        params = {
+            "language": language_code,
+            "categories": [category.pk for category in categories],
+            "areas": [area.pk for area in areas],
+        }
+        if start_date:
+            params["start_date"] = start_date.isoformat()
+        if end_date:
+            params["end_date"] = end_date.isoformat()
+        if near:
+            params["near"] = f"{near[0]},{near[1]}"
+            params["radius"] = radius
+        return f"{url}?{urlencode(params, doseq=True)}"
+
     def get_context(self, value, parent_context=None):
         # from home.models import EventPage  # Lazy import here
 
@@ -69,29 +114,30 @@ class EventsBlock(blocks.StructBlock):
         if not request:
             raise ValueError("Request object is missing in the context.")
 
-        start_date = request.GET.get("start_date")
-        end_date = request.GET.get("end_date")
-        start_date = parse_date(start_date).date() if start_date else None
-        end_date = parse_date(end_date).date() if end_date else None
+        from dateutil.parser import parse as parse_date
 
-        area_ids = [int(a) for a in request.GET.getlist("areas") if a.isdigit()]
+        params = self.get_request_params(request)
 
-        if area_ids:
-            selected_areas = EventArea.objects.filter(id__in=area_ids)
+        start_date = params["start_date"][-1] if params["start_date"] else None
+        end_date = params["end_date"][-1] if params["end_date"] else None
+        start_date = parse_date(start_date).date() if start_date else None
+        end_date = parse_date(end_date).date() if end_date else None
 
-            selected_translation_keys = selected_areas.values_list(
-                "translation_key", flat=True
-            )
+        area_ids = [int(a) for a in params["areas"] if a.isdigit()]
 
-            translated_areas = EventArea.objects.filter(
-                translation_key__in=selected_translation_keys,
-                locale_id=current_locale.id,
-            )
+        # "near" is a "lat,lng" point; without a valid one the radius is ignored
+        near = geo.parse_point(params["near"][-1]) if params["near"] else None
+        radius = None
+        if near:
+            radius = geo.parse_radius(params["radius"][-1] if params["radius"] else None)
 
-        else:
-            translated_areas = []
+        # Areas and categories come from the in-process catalogue, not the database
+        language_code = current_locale.language_code
+        translated_areas = translate_areas(area_ids, language_code) if area_ids else []
 
-        selected_categories = self.get_selected_categories(value)
+        selected_categories = translate_categories(
+            self.get_selected_categories(value), language_code
+        )
 
         # Use EventsPage method instead of Event
         filtered_events = Event.get_filtered_events(
@@ -101,53 +147,118 @@ class EventsBlock(blocks.StructBlock):
             areas=translated_areas,
         )
 
-        filtered_events = filtered_events.order_by("date_instances")
+        # One row per event, so pagination counts events rather than occurrences.
+        # A "near" search is sorted by distance, otherwise by the next date.
+        if near:
+            filtered_events = geo.filter_within_radius(
+                filtered_events, *near, radius, locale=current_locale
+            )
+            sort_key = "distance"
+        else:
+            sort_key = "next_occurrence"
+
+        # The dates listed for each event lie in the same range as the filter
+        upcoming_dates = EventDateInstance.objects.filter(
+            date__gte=start_date or timezone.localdate()
+        )
+        if end_date:
+            upcoming_dates = upcoming_dates.filter(date__lte=end_date)
+
+        filtered_events = filtered_events.order_by(
+            F(sort_key).asc(nulls_last=True), "pk"
+        ).prefetch_related(
+            Prefetch(
+                "date_instances",
+                queryset=upcoming_dates[: self.upcoming_dates_limit],
+                to_attr="upcoming_dates",
+            ),
+            # Images and their listing renditions for the whole page in two queries
+            Prefetch("image", queryset=get_listing_images()),
+        )
 
-        paginated_events = paginate(request, filtered_events, per_page=10)
+        keyset_pagination = getattr(settings, "WISS_EVENTS_KEYSET_PAGINATION", False)
+        if keyset_pagination:
+            paginated_events = keyset_paginate(
+                request,
+                filtered_events,
+                key=sort_key,
+                per_page=10,
+                count_cache_key=self.get_count_cache_key(
+                    current_locale,
+                    selected_categories,
+                    start_date,
+                    end_date,
+                    translated_areas,
+                    near,
+                    radius,
+                ),
+            )
+        else:
+            paginated_events = paginate(request, filtered_events, per_page=10)
+
+        geojson_url = self.get_geojson_url(
+            language_code,
+            selected_categories,
+            start_date,
+            end_date,
+            translated_areas,
+            near,
+            radius,
+        )
 
+        # The map fits the events on this page; with the feed installed it loads the
+        # markers in view from there, otherwise they are inlined in the page
         map_events = []
+        points = []
 
         for event in paginated_events:
-            lat, lon = event.get_lat_lon()
-            #if lat and lon:
-                #distance = haversine(53.1771078,-4.0486885, lat, lon)
-                #print(distance)
-            
-            coords = (
-                self.parse_wkt_point(event.geolocation) if event.geolocation else None
-            )
-            if coords:
-                lat, lng = coords
+            lat, lng = event.get_lat_lon()
+            if lat is not None and lng is not None:
                 event.map_lat = lat
                 event.map_lng = lng
-                map_events.append(
-                    {
-                        "title": event.title,
-                        "description": (
-                            str(event.description) if event.description else ""
-                        ),
-                        "url": event.url_link if event.url_link else "",
-                        "lat": float(lat),
-                        "lng": float(lng),
-                    }
-                )
+                points.append((lat, lng))
+                if not geojson_url:
+                    map_events.append(
+                        {
+                            "title": event.title,
+                            "description": (
+                                str(event.description) if event.description else ""
+                            ),
+                            "url": event.url_link if event.url_link else "",
+                            "lat": lat,
+                            "lng": lng,
+                        }
+                    )
+
+        map_bounds = None
+        if points:
+            lats, lngs = zip(*points)
+            map_bounds = [[min(lats), min(lngs)], [max(lats), max(lngs)]]
 
         context["map_events"] = map_events
+        context["map_bounds"] = map_bounds
+        context["geojson_url"] = geojson_url
         context["events"] = paginated_events
+        context["keyset_pagination"] = keyset_pagination
         context["start_date"] = start_date
         context["end_date"] = end_date
         context["categories"] = selected_categories
-        context["areas"] = EventArea.objects.filter(locale_id=current_locale.id)
+        context["areas"] = get_areas(language_code)
         context["selected_areas"] = translated_areas
+        context["near"] = near
+        context["radius"] = radius
+        context["radius_choices"] = self.radius_choices
 
-        # Fetch all labels for this locale
-        labels_qs = Label.objects.filter(locale=current_locale)
-        labels_dict = {label.key: label.value for label in labels_qs}
-
-        context["labels"] = labels_dict
+        # All labels for this locale, from the in-process catalogue
+        context["labels"] = get_labels(language_code)
 
         return context
 
+    def get_cache_expiry(self, value):
+        # Without a start date the listing counts from today, so treat it as stale at midnight
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        return timezone.make_aware(datetime.combine(tomorrow, time.min))
+
     class Meta:
         icon = "image"
         label = "Events block"
@@ -0,0 +1,95 @@
+from wagtail.models import Locale
+
+from wagtail_wiss.shared_utils.catalogue import VersionedCatalogue
+
+
+def _get_locale(language_code):
+    try:
+        return Locale.objects.get(language_code=language_code)
+    except Locale.DoesNotExist:
+        return Locale.get_default()
+
+
+def load_labels(language_code):
+    from .models import Label
+
+    return dict(
+        Label.objects.filter(locale=_get_locale(language_code)).values_list(
+            "key", "value"
+        )
+    )
+
+
+label_catalogue = VersionedCatalogue("labels", load_labels)
+
+
+def load_filter_options(language_code):
+    from .models import EventArea, EventsCategory
+
+    locale = _get_locale(language_code)
+    areas = list(EventArea.objects.filter(locale=locale))
+    return {
+        "areas": areas,
+        "areas_by_key": {area.translation_key: area for area in areas},
+        "categories_by_key": {
+            category.translation_key: category
+            for category in EventsCategory.objects.filter(locale=locale)
+        },
+    }
+
+
+def load_translation_keys(language_code):
+    from .models import EventArea
+
+    # Submitted ids may belong to any locale, so this one covers them all
+    return {"areas": dict(EventArea.objects.values_list("pk", "translation_key"))}
+
+
+filter_options_catalogue = VersionedCatalogue("event_filters", load_filter_options)
+translation_keys_catalogue = VersionedCatalogue(
+    "event_filter_keys", load_translation_keys
+)
+
+
+def invalidate_filter_options():
+    filter_options_catalogue.invalidate()
+    translation_keys_catalogue.invalidate()
+
+
+def get_labels(language_code=None):
+    """
+    Return every label of a locale (the active one by default) as a `{key: value}` dict.
+    """
+    return label_catalogue.get(language_code)
+
+
+def get_areas(language_code=None):
+    """
+    Return the areas of a locale (the active one by default), ordered by name.
+    """
+    return filter_options_catalogue.get(language_code)["areas"]
+
+
+def translate_areas(area_ids, language_code=None):
+    """
+    Map area ids from any locale to the matching areas of a locale, without a query.
+    """
+    keys = translation_keys_catalogue.get("*")["areas"]
+    areas_by_key = filter_options_catalogue.get(language_code)["areas_by_key"]
+    translated = {
+        keys[pk] for pk in area_ids if pk in keys and keys[pk] in areas_by_key
+    }
+    return [
+        area for area in get_areas(language_code) if area.translation_key in translated
+    ]
+
+
+def translate_categories(categories, language_code=None):
+    """
+    Map categories to their versions in a locale, keeping any that are not translated.
+    """
+    categories_by_key = filter_options_catalogue.get(language_code)["categories_by_key"]
+    return [
+        categories_by_key.get(category.translation_key, category)
+        for category in categories
+    ]
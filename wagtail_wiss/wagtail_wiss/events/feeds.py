@@ -0,0 +1,202 @@
+"""
+Machine-readable feeds of events, for the events map.
+
+Feed bodies are cached whole, keyed on the request's filters and on `events_version`,
+a shared counter bumped whenever an event or its dates change. The same key doubles
+as the ETag, so a client holding the current body gets a 304 without any query.
+"""
+
+import hashlib
+import json
+import math
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
+from django.utils import timezone, translation
+
+from wagtail_wiss.shared_utils.catalogue import SharedVersion
+
+from . import geo
+
+# Bumped on any change to events, their dates, categories or areas
+events_version = SharedVersion("events")
+
+# How long a rendered feed body is kept; a version bump makes it unreachable sooner
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Browsers revalidate after this many seconds, cheaply thanks to the ETag
+FEED_MAX_AGE = 60
+
+# A map should never need more markers than this from one request
+GEOJSON_MAX_FEATURES = 5000
+
+# Coordinates are rounded to about a metre
+COORDINATE_PRECISION = 5
+
+
+def parse_bbox(value):
+    """
+    Parse a "west,south,east,north" string, the order used by GeoJSON and Leaflet's
+    `toBBoxString()`, returning `(south, west, north, east)` or None if it is invalid.
+    """
+    try:
+        west, south, east, north = (float(part) for part in value.split(","))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if not all(math.isfinite(v) for v in (west, south, east, north)):
+        return None
+    if south > north or west > east:
+        return None
+    return max(south, -90.0), max(west, -180.0), min(north, 90.0), min(east, 180.0)
+
+
+def snap_bbox(bbox, step):
+    """
+    Widen a `(south, west, north, east)` box to multiples of `step` degrees, so that
+    slightly different map views share a cached response.
+    """
+    south, west, north, east = bbox
+    return (
+        max(math.floor(south / step) * step, -90.0),
+        max(math.floor(west / step) * step, -180.0),
+        min(math.ceil(north / step) * step, 90.0),
+        min(math.ceil(east / step) * step, 180.0),
+    )
+
+
+def make_feed_key(kind, language_code, params):
+    """
+    Build the cache key and ETag of a feed from its kind, language and filters.
+
+    The date is part of the key because listings count from today.
+    """
+    version = events_version.get_version()
+    payload = json.dumps(
+        [kind, version, language_code, timezone.localdate(), params],
+        cls=DjangoJSONEncoder,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cached(key):
+    """
+    Return the `(body, modified)` stored by `cached_stream`, or None.
+    """
+    return events_version.cache.get(key)
+
+
+def cached_stream(key, chunks, modified=None, timeout=FEED_CACHE_TIMEOUT):
+    """
+    Yield `chunks` while collecting them, then store the whole body under `key`,
+    together with the time it was `modified`.
+
+    Nothing is stored if the client goes away before the end.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    events_version.cache.set(key, ("".join(parts), modified), timeout)
+
+
+def render_popup(event, labels):
+    """
+    Render the map popup of an event.
+    """
+    return render_to_string(
+        "wagtail_wiss/events/includes/_event_popup.html",
+        {"event": event, "labels": labels},
+    )
+
+
+def _point(lat, lng):
+    return {
+        "type": "Point",
+        "coordinates": [
+            round(lng, COORDINATE_PRECISION),
+            round(lat, COORDINATE_PRECISION),
+        ],
+    }
+
+
+def _event_feature(event, labels):
+    return {
+        "type": "Feature",
+        "id": event.pk,
+        "geometry": _point(event.lat, event.lng),
+        "properties": {"popup": render_popup(event, labels)},
+    }
+
+
+def _iter_collection(features, limit):
+    yield '{"type":"FeatureCollection","features":['
+    count = 0
+    truncated = False
+    for feature in features:
+        if count == limit:
+            truncated = True
+            break
+        yield ("," if count else "") + json.dumps(feature, separators=(",", ":"))
+        count += 1
+    yield "]" + (',"truncated":true}' if truncated else "}")
+
+
+def iter_geojson(events, labels, language_code, limit=GEOJSON_MAX_FEATURES):
+    """
+    Yield a compact GeoJSON FeatureCollection of `events` in pieces.
+
+    Each feature carries the event id, its point and its pre-rendered popup HTML.
+    When more than `limit` events match, only the first `limit` are included and
+    the collection has `"truncated": true`.
+
+    Args:
+        events (QuerySet): Events with `lat` and `lng`.
+        labels (dict): The label catalogue for the popups.
+        language_code (str): Rendering happens as the body is sent, after the view
+            returns, so the language is activated here.
+        limit (int): The most features to include.
+    """
+    with translation.override(language_code):
+        features = (
+            _event_feature(event, labels)
+            for event in events[: limit + 1].iterator(chunk_size=500)
+        )
+        yield from _iter_collection(features, limit)
+
+
+def iter_clustered_geojson(
+    events, labels, language_code, zoom, limit=GEOJSON_MAX_FEATURES
+):
+    """
+    Yield a GeoJSON FeatureCollection of `events` clustered for a map zoom level.
+
+    Events are grouped on a grid sized for `zoom` (see `geo.get_cluster_size`). A
+    square holding several events becomes one feature at their mean position, with
+    `"cluster": true` and their `count` as properties; an event alone in its square
+    is included as in `iter_geojson`, with its popup.
+
+    Args:
+        events (QuerySet): Events with `lat` and `lng`.
+        labels (dict): The label catalogue for the popups.
+        language_code (str): The language to render popups in.
+        zoom (int): The map zoom level.
+        limit (int): The most features to include.
+    """
+    clusters = list(geo.cluster_points(events, geo.get_cluster_size(zoom)))
+    single_pks = [cluster["first_pk"] for cluster in clusters if cluster["count"] == 1]
+    single_pks = single_pks[: limit + 1]
+
+    def features():
+        for cluster in clusters:
+            if cluster["count"] > 1:
+                yield {
+                    "type": "Feature",
+                    "geometry": _point(cluster["centre_lat"], cluster["centre_lng"]),
+                    "properties": {"cluster": True, "count": cluster["count"]},
+                }
+        for event in events.filter(pk__in=single_pks).iterator(chunk_size=500):
+            yield _event_feature(event, labels)
+
+    with translation.override(language_code):
+        yield from _iter_collection(features(), limit)
@@ -0,0 +1,255 @@
+"""
+Proximity and viewport queries on the `Event.lat` / `Event.lng` columns.
+
+Every event also stores the id of the cell it falls in on a fixed grid of
+`WISS_EVENT_GEO_CELL_DEGREES` squares, numbered row by row from the south-west
+corner. A box on the map covers a run of consecutive ids in each row it spans,
+so it becomes a handful of range conditions on the `(locale, geo_cell)` index
+instead of a scan; the exact `lat` / `lng` bounds are then checked on those rows.
+
+Distances are great-circle distances from the haversine formula, computed by the
+database as an annotation so only the matching page of events is loaded, and only
+on rows inside the bounding box.
+"""
+
+import math
+
+from django.conf import settings
+from django.db.models import Avg, Count, F, FloatField, Min, Q, Value
+from django.db.models.functions import (
+    ASin,
+    Cos,
+    Floor,
+    Least,
+    Power,
+    Radians,
+    Sin,
+    Sqrt,
+)
+
+# Mean radius of the Earth, in kilometres
+EARTH_RADIUS_KM = 6371.0
+
+# The side of a grid cell in degrees; about 11 km north to south
+DEFAULT_CELL_DEGREES = 0.1
+
+# Above this many ranges, neighbouring rows are merged to keep the query short
+MAX_CELL_RANGES = 32
+
+# Clusters are squares of about a quarter of a 256 pixel map tile at each zoom level
+CLUSTERS_PER_TILE = 4
+
+# From this zoom level on, maps show single events rather than clusters
+DEFAULT_CLUSTER_MAX_ZOOM = 14
+
+# Used when a "near" search gives no radius, and the most a search may ask for
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+
+
+def parse_point(value):
+    """
+    Parse a "lat,lng" string, returning (lat, lng) or None if it is not a valid point.
+    """
+    try:
+        lat, lng = (float(part) for part in value.split(","))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def parse_radius(value, default=DEFAULT_RADIUS_KM):
+    """
+    Parse a radius in kilometres, falling back to `default` and capped at MAX_RADIUS_KM.
+    """
+    try:
+        radius = float(value)
+    except (TypeError, ValueError):
+        return default
+    if not math.isfinite(radius) or radius <= 0:
+        return default
+    return min(radius, MAX_RADIUS_KM)
+
+
+def get_cell_size():
+    return getattr(settings, "WISS_EVENT_GEO_CELL_DEGREES", DEFAULT_CELL_DEGREES)
+
+
+def _grid_shape(size):
+    return math.ceil(180 / size), math.ceil(360 / size)
+
+
+def _cell_index(lat, lng, size):
+    rows, columns = _grid_shape(size)
+    row = min(max(math.floor((lat + 90) / size), 0), rows - 1)
+    column = min(max(math.floor((lng + 180) / size), 0), columns - 1)
+    return row, column
+
+
+def get_cell(lat, lng, size=None):
+    """
+    Return the id of the grid cell containing a point, or None if it has no coordinates.
+    """
+    if lat is None or lng is None:
+        return None
+    size = size or get_cell_size()
+    row, column = _cell_index(lat, lng, size)
+    return row * _grid_shape(size)[1] + column
+
+
+def cell_ranges(south, west, north, east, size=None, max_ranges=MAX_CELL_RANGES):
+    """
+    Return the cell ids covering a box as a list of inclusive `(first, last)` ranges.
+
+    Each row of the grid the box spans gives one range. When there would be more than
+    `max_ranges`, neighbouring rows are merged into one range, which also takes in the
+    cells between them outside the box; the ranges always cover the box, never less.
+    """
+    size = size or get_cell_size()
+    columns = _grid_shape(size)[1]
+    first_row, west_column = _cell_index(south, west, size)
+    last_row, east_column = _cell_index(north, east, size)
+
+    rows_per_range = math.ceil((last_row - first_row + 1) / max(max_ranges, 1))
+    return [
+        (
+            row * columns + west_column,
+            min(row + rows_per_range - 1, last_row) * columns + east_column,
+        )
+        for row in range(first_row, last_row + 1, rows_per_range)
+    ]
+
+
+def cell_filter(south, west, north, east, field="geo_cell", **conditions):
+    """
+    Build a filter matching the cell ids that cover a box.
+
+    Any extra `conditions` are repeated in every range, so each one can be answered
+    by a single scan of a composite index that starts with those columns.
+    """
+    condition = Q()
+    for first, last in cell_ranges(south, west, north, east):
+        condition |= Q(**conditions, **{f"{field}__range": (first, last)})
+    return condition
+
+
+def filter_within_bbox(queryset, south, west, north, east, locale=None):
+    """
+    Restrict `queryset` to rows inside a `(south, west, north, east)` box, using the
+    grid cells to find candidates and the coordinates to check them. Pass the
+    `locale` the rows are limited to so the `(locale, geo_cell)` index can be used.
+    """
+    conditions = {"locale": locale} if locale is not None else {}
+    return queryset.filter(
+        cell_filter(south, west, north, east, **conditions),
+        lat__range=(south, north),
+        lng__range=(west, east),
+    )
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Return the (south, west, north, east) box enclosing a circle around a point.
+
+    The box is slightly larger than the circle, never smaller. Near a pole, or where
+    the circle crosses the antimeridian, the longitude range is widened to the whole
+    globe rather than split in two.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = lat - delta_lat, lat + delta_lat
+    if south <= -90 or north >= 90:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+
+    # The widest point of the circle in longitude is nearer the pole than its centre
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+    delta_lng = math.degrees(math.asin(min(ratio, 1.0)))
+    west, east = lng - delta_lng, lng + delta_lng
+    if west < -180 or east > 180:
+        return south, -180.0, north, 180.0
+    return south, west, north, east
+
+
+def distance_expression(lat, lng, lat_field="lat", lng_field="lng"):
+    """
+    Build a database expression for the haversine distance in kilometres between a
+    point and the coordinates in `lat_field` / `lng_field`.
+    """
+    lat_rad = math.radians(lat)
+    half_dlat = (Radians(F(lat_field)) - Value(lat_rad)) / Value(2.0)
+    half_dlng = (Radians(F(lng_field)) - Value(math.radians(lng))) / Value(2.0)
+    a = Power(Sin(half_dlat), 2) + Value(math.cos(lat_rad)) * Cos(
+        Radians(F(lat_field))
+    ) * Power(Sin(half_dlng), 2)
+
+    # Rounding can push `a` a hair above 1 for antipodal points, outside ASIN's domain
+    return Value(2 * EARTH_RADIUS_KM) * ASin(
+        Sqrt(Least(a, Value(1.0))), output_field=FloatField()
+    )
+
+
+def filter_within_radius(
+    queryset, lat, lng, radius_km, locale=None, annotation="distance"
+):
+    """
+    Restrict `queryset` to rows within `radius_km` of a point, annotating each with its
+    distance in kilometres.
+
+    Args:
+        queryset (QuerySet): Rows with `lat` and `lng` columns, e.g. events.
+        lat (float): Latitude of the point, in degrees.
+        lng (float): Longitude of the point, in degrees.
+        radius_km (float): The search radius.
+        locale (Locale): The locale the rows are limited to, if any; see
+            `filter_within_bbox`.
+        annotation (str): The name the distance is annotated under.
+
+    Returns:
+        QuerySet: The filtered, annotated rows; the ordering is left unchanged.
+    """
+    return (
+        filter_within_bbox(queryset, *bounding_box(lat, lng, radius_km), locale=locale)
+        .annotate(**{annotation: distance_expression(lat, lng)})
+        .filter(**{f"{annotation}__lte": radius_km})
+    )
+
+
+def get_cluster_max_zoom():
+    return getattr(settings, "WISS_EVENT_CLUSTER_MAX_ZOOM", DEFAULT_CLUSTER_MAX_ZOOM)
+
+
+def get_cluster_size(zoom):
+    """
+    Return the side, in degrees, of the squares points are clustered in at a zoom level.
+    """
+    return 360 / (2**zoom * CLUSTERS_PER_TILE)
+
+
+def cluster_points(queryset, size):
+    """
+    Group rows into squares of `size` degrees aligned on the globe, in the database.
+
+    Because the squares do not depend on the viewport, a cluster stays the same as
+    the map is panned.
+
+    Returns:
+        QuerySet: Dicts with the square's `cluster_row` and `cluster_column`, the
+            number of rows in it as `count`, their mean position as `centre_lat` and
+            `centre_lng`, and the lowest primary key as `first_pk`, which identifies
+            the row when there is only one.
+    """
+    return (
+        queryset.order_by()
+        .annotate(
+            cluster_row=Floor(F("lat") / Value(size)),
+            cluster_column=Floor(F("lng") / Value(size)),
+        )
+        .values("cluster_row", "cluster_column")
+        .annotate(
+            count=Count("pk"),
+            centre_lat=Avg("lat"),
+            centre_lng=Avg("lng"),
+            first_pk=Min("pk"),
+        )
+    )
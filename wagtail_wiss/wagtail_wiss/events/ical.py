@@ -0,0 +1,182 @@
+"""
+iCalendar (RFC 5545) output for events.
+
+Each `EventDate` rule becomes one all-day VEVENT. The four frequencies offered in
+the admin map directly onto an RRULE, so a rule repeating for years is a few lines
+rather than one VEVENT per `EventDateInstance`. Anything else is written out as
+RDATEs up to the materialisation horizon.
+"""
+
+import html
+import re
+from datetime import timedelta
+
+from django.utils.html import strip_tags
+
+from . import recurrence
+
+RRULE_FREQUENCIES = {
+    recurrence.DAILY: "DAILY",
+    recurrence.WEEKLY: "WEEKLY",
+    recurrence.MONTHLY: "MONTHLY",
+    recurrence.YEARLY: "YEARLY",
+}
+
+# Content lines longer than this many octets are folded
+MAX_LINE_OCTETS = 75
+
+# Tags that end a line of text when rich text is flattened
+BLOCK_END_RE = re.compile(r"</(?:p|h[1-6]|li|blockquote)>|<br\s*/?>", re.IGNORECASE)
+
+
+def escape_text(value):
+    """
+    Escape a TEXT property value: backslashes, semicolons, commas and newlines.
+    """
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+        .replace("\r", "\\n")
+    )
+
+
+def fold_line(line):
+    """
+    Fold a content line into CRLF-terminated lines of at most 75 octets, never
+    splitting a UTF-8 character; continuation lines start with a space.
+    """
+    parts = []
+    current = ""
+    size = 0
+    limit = MAX_LINE_OCTETS
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > limit:
+            parts.append(current)
+            # The leading space of a continuation line counts towards its length
+            current, size, limit = char, char_size, MAX_LINE_OCTETS - 1
+        else:
+            current += char
+            size += char_size
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_date(value):
+    return value.strftime("%Y%m%d")
+
+
+def format_datetime(value):
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def to_plain_text(rich_text):
+    """
+    Reduce rich text to plain text for a DESCRIPTION.
+    """
+    text = BLOCK_END_RE.sub("\n", str(rich_text))
+    return html.unescape(strip_tags(text)).strip()
+
+
+def get_rule_lines(rule, until):
+    """
+    Return the DTSTART/DTEND and recurrence lines of an `EventDate`.
+
+    Rules the admin treats as a single date (no end date and not open-ended, or an
+    end before the start) get no recurrence, matching `recurrence.expand_rule`.
+    """
+    lines = [
+        f"DTSTART;VALUE=DATE:{format_date(rule.start_date)}",
+        f"DTEND;VALUE=DATE:{format_date(rule.start_date + timedelta(days=1))}",
+    ]
+    if not rule.end_date and not rule.open_ended:
+        return lines
+    if rule.end_date and rule.end_date < rule.start_date:
+        return lines
+
+    frequency = RRULE_FREQUENCIES.get(rule.frequency)
+    if frequency:
+        rrule = f"RRULE:FREQ={frequency}"
+        if rule.interval and rule.interval > 1:
+            rrule += f";INTERVAL={rule.interval}"
+        if rule.end_date:
+            rrule += f";UNTIL={format_date(rule.end_date)}"
+        lines.append(rrule)
+        return lines
+
+    dates = [
+        format_date(d)
+        for d in recurrence.expand_rule(
+            rule.start_date,
+            rule.end_date,
+            rule.frequency,
+            rule.interval,
+            rule.open_ended,
+            until,
+        )
+        if d != rule.start_date
+    ]
+    if dates:
+        lines.append(f"RDATE;VALUE=DATE:{','.join(dates)}")
+    return lines
+
+
+def iter_event_lines(event, rules, uid_domain, stamp, until, url=None):
+    """
+    Yield the unfolded content lines of the VEVENTs of one event, one per rule.
+    """
+    categories = ",".join(
+        escape_text(category.name) for category in event.categories.all()
+    )
+    location = event.location or event.address
+    for rule in rules:
+        yield "BEGIN:VEVENT"
+        yield f"UID:event-{event.pk}-{rule.pk}@{uid_domain}"
+        yield f"DTSTAMP:{format_datetime(stamp)}"
+        yield from get_rule_lines(rule, until)
+        yield f"SUMMARY:{escape_text(event.title)}"
+        if event.description:
+            yield f"DESCRIPTION:{escape_text(to_plain_text(event.description))}"
+        if location:
+            yield f"LOCATION:{escape_text(location)}"
+        if event.lat is not None and event.lng is not None:
+            yield f"GEO:{event.lat:.6f};{event.lng:.6f}"
+        if categories:
+            yield f"CATEGORIES:{categories}"
+        if url:
+            yield f"URL:{url}"
+        yield "END:VEVENT"
+
+
+def iter_calendar(events, name, language_code, uid_domain, stamp, until, get_url):
+    """
+    Yield a VCALENDAR of `events` as folded, CRLF-terminated lines.
+
+    Args:
+        events (iterable): Events with `event_dates` and `categories` prefetched.
+        name (str): The calendar's display name.
+        language_code (str): The language of the text.
+        uid_domain (str): The domain that makes each VEVENT's UID globally unique.
+        stamp (datetime): The DTSTAMP of every VEVENT, in UTC.
+        until (date): How far rules that cannot be an RRULE are expanded.
+        get_url (callable): Returns the public URL of an event, or None.
+    """
+    header = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:-//WiSS//Events//{language_code.upper()}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ]
+    yield "".join(fold_line(line) for line in header)
+    for event in events:
+        lines = iter_event_lines(
+            event, event.event_dates.all(), uid_domain, stamp, until, get_url(event)
+        )
+        yield "".join(fold_line(line) for line in lines)
+    yield fold_line("END:VCALENDAR")
@@ -1,10 +1,9 @@
-from django.db import models
-from django.db.models import Q
-from django.db import transaction
+from django.db import connections, models, router
+from django.db.models import Exists, OuterRef, Q, Subquery
 from django.conf import settings
+from django.utils import timezone
 
 from datetime import date
-from dateutil.rrule import rrule
 
 from wagtail.models import TranslatableMixin, Page, Locale
 from wagtail.admin.panels import FieldPanel
@@ -14,10 +13,7 @@ from wagtail.fields import RichTextField
 
 from modelcluster.models import ClusterableModel, ParentalKey
 
-from PIL import Image as PilImage
-import pytesseract
-import requests
-from io import BytesIO
+from . import geo, recurrence
 
 
 class EventsCategory(TranslatableMixin, models.Model):
@@ -110,6 +106,10 @@ class Event(TranslatableMixin, ClusterableModel):
         description (RichTextField): A rich text description of the event (optional).
         location (CharField): The location of the event (optional).
         geolocation (CharField): Geolocation data for the event (optional).
+        lat (FloatField): Latitude parsed from `geolocation` on save.
+        lng (FloatField): Longitude parsed from `geolocation` on save.
+        geo_cell (BigIntegerField): The spatial grid cell `lat` / `lng` fall in, set on
+            save; see `events.geo`.
         slug (SlugField): A unique URL-friendly identifier for the event.
         categories (ManyToManyField): Categories associated with the event.
         image (ForeignKey): An optional image associated with the event.
@@ -121,16 +121,32 @@ class Event(TranslatableMixin, ClusterableModel):
         page_link (ForeignKey): A link to a related page (optional).
         use_page_title (BooleanField): Whether to append the linked page's title to the link text.
         url_link (URLField): An external URL link for the event (optional).
+        occurrence_fingerprint (CharField): Digest of the `EventDate` rules the date
+            instances were last generated from, used to skip unchanged refreshes.
+        occurrences_materialised_until (DateField): The horizon the date instances were
+            last generated up to.
         search_fields (list): Fields to include in search indexing.
 
     Methods:
         __str__(): Returns the string representation of the event (its title).
         display_categories(): Returns a comma-separated string of associated category names.
-        refresh_event_date_instances(): Refreshes the `EventDateInstance` table with unique dates
-            generated from associated `EventDate` objects.
-        save(*args, **kwargs): Overrides the save method to refresh event date instances after saving.
-        get_filtered_events(categories=None, start_date=None, end_date=None, areas=None):
-            Retrieves events filtered by categories, date range, and areas.
+        get_occurrence_dates(until=None): Returns the set of unique dates generated from the
+            associated `EventDate` objects, up to the materialisation horizon.
+        refresh_event_date_instances(): Inserts missing and deletes stale `EventDateInstance`
+            rows for those dates, returning the number of rows added and removed.
+        save(*args, **kwargs): Overrides the save method to schedule a refresh of the event
+            date instances, and the listing rendition of a changed image, when the
+            transaction commits.
+        get_filtered_events(categories=None, start_date=None, end_date=None, areas=None,
+            use_read_model=None, bbox=None):
+            Retrieves events filtered by categories, date range, areas and bounding box,
+            annotated with their next occurrence in that range.
+        filter_by_joins(events, categories, start_date, end_date, areas):
+            Applies the listing filters as EXISTS subqueries against the source tables.
+        filter_occurrences(locale, categories, start_date, end_date, areas):
+            Returns the `EventOccurrence` rows matching the listing filters.
+        can_use_read_model(categories=None, start_date=None, end_date=None, areas=None):
+            Returns whether those filters can be answered from `EventOccurrence`.
         ordered_areas(): Returns the areas associated with the event, ordered by name.
 
     Meta:
@@ -143,6 +159,10 @@ class Event(TranslatableMixin, ClusterableModel):
     description = RichTextField(null=True, blank=True)
     location = models.CharField(max_length=255, null=True, blank=True)
     geolocation = models.CharField(max_length=250, blank=True, null=True)
+    # Parsed from geolocation on save
+    lat = models.FloatField(null=True, blank=True, editable=False)
+    lng = models.FloatField(null=True, blank=True, editable=False)
+    geo_cell = models.BigIntegerField(null=True, blank=True, editable=False)
     slug = models.SlugField(
         max_length=80,
         unique=False,
@@ -177,12 +197,21 @@ class Event(TranslatableMixin, ClusterableModel):
         help_text="Append the title of the linked page to the link text.",
     )
     url_link = models.URLField(blank=True, null=True)
+    # Digest of the EventDate rules the date instances were last generated from
+    occurrence_fingerprint = models.CharField(max_length=64, blank=True, editable=False)
+    # Last date the date instances have been generated up to
+    occurrences_materialised_until = models.DateField(
+        null=True, blank=True, editable=False
+    )
 
     search_fields = [
         index.SearchField("title"),
         index.SearchField("description"),
     ]
 
+    # The image id as loaded from the database; None for a new event
+    _loaded_image_id = None
+
     def __str__(self):
         return self.title
 
@@ -191,35 +220,43 @@ class Event(TranslatableMixin, ClusterableModel):
 
     display_categories.short_description = "categories"
 
-    def refresh_event_date_instances(self):
+    def get_occurrence_dates(self, until=None):
         """
-        Refresh the `EventDateInstance` table with all unique generated dates.
+        Return the set of unique dates generated by the event's `EventDate` rules,
+        up to `until` (the materialisation horizon by default).
         """
-        # Clear all existing instances for this event
-        self.date_instances.all().delete()
-
-        # Generate new instances from EventDate
-        all_dates = []
+        dates = set()
         for event_date in self.event_dates.all():
-            dates = event_date.generate_dates()
-            all_dates.extend(dates)
+            dates.update(event_date.generate_dates(until=until))
+        return dates
 
-        # Use a set to remove duplicates
-        unique_dates = set(all_dates)
+    def refresh_event_date_instances(self):
+        """
+        Bring the `EventDateInstance` table in line with the generated dates.
+
+        Only missing dates are inserted and only stale dates are deleted, both in
+        batches, so saving an event with unchanged rules writes nothing.
+
+        Returns:
+            dict: The number of rows "added" and "removed".
+        """
+        from .occurrences import refresh_occurrences
 
-        # Bulk create EventDateInstance rows
-        instances = [EventDateInstance(event=self, date=d) for d in unique_dates]
-        EventDateInstance.objects.bulk_create(instances)
+        return refresh_occurrences([self.pk], force=True)
 
     def save(self, *args, **kwargs):
         """
         Override save to refresh event date instances after saving.
         """
         # super().save(*args, **kwargs)
-        transaction.on_commit(lambda: self.refresh_event_date_instances())
 
         #  # Perform OCR only if there's an image and no existing OCR text
         # if self.image and not self.ocr_text:
+        #     # Imported here: OCR and HTTP are too heavy to load with the models
+        #     from io import BytesIO
+        #     import pytesseract
+        #     import requests
+        #     from PIL import Image as PilImage
         #     try:
         #         # Download image from Wagtail image URL
         #         image_url = self.image.file.url
@@ -231,21 +268,41 @@ class Event(TranslatableMixin, ClusterableModel):
         #     except Exception as e:
         #         self.ocr_text = f"OCR failed: {e}"
 
+        # Parsed once here so listings and maps read plain columns
+        self.lat, self.lng = self.parse_geolocation_string(self.geolocation)
+        self.geo_cell = geo.get_cell(self.lat, self.lng)
+
         super().save(*args, **kwargs)
 
+        # Scheduled after the save: outside a transaction the refresh runs immediately
+        from .occurrences import schedule_occurrence_refresh
+
+        schedule_occurrence_refresh(self)
+
+        # A new image gets its listing rendition now, not on the first page view
+        if self.image_id and self.image_id != self._loaded_image_id:
+            from .renditions import schedule_listing_rendition
+
+            schedule_listing_rendition(self.image_id)
+        self._loaded_image_id = self.image_id
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can tell when the image changes
+        instance._loaded_image_id = instance.__dict__.get("image_id")
+        return instance
+
     def get_lat_lon(self):
-        if not self.geolocation or not self.geolocation.startswith("SRID=4326;POINT("):
-            return None, None
-        try:
-            point_str = self.geolocation.split("POINT(")[-1].rstrip(")")
-            lon_str, lat_str = point_str.split()
-            return float(lat_str), float(lon_str)
-        except ValueError:
-            return None, None
+        return self.lat, self.lng
 
     @staticmethod
     def parse_geolocation_string(geo_str):
-        if not geo_str or not geo_str.startswith("SRID=4326;POINT("):
+        """
+        Parse a `SRID=4326;POINT(lon lat)` string (the SRID prefix is optional) into
+        `(lat, lng)`, or `(None, None)` if it is empty or malformed.
+        """
+        if not geo_str or "POINT(" not in geo_str:
             return None, None
         try:
             # Extract "POINT(lon lat)"
@@ -257,13 +314,27 @@ class Event(TranslatableMixin, ClusterableModel):
 
     @staticmethod
     def get_filtered_events(
-        categories=None, start_date=None, end_date=None, areas=None
+        categories=None,
+        start_date=None,
+        end_date=None,
+        areas=None,
+        use_read_model=None,
+        bbox=None,
     ):
         """
         Retrieve events filtered by the given categories, date range, and areas.
+        `categories` and `areas` may be querysets or any iterable of instances, and
+        `bbox` is an optional `(south, west, north, east)` box the event must lie in.
+
+        Each event is annotated with `next_occurrence`: its first date on or after
+        `start_date` (today when not given) and not after `end_date`, or None.
+
+        A date-filtered query is answered from the `EventOccurrence` read model when it
+        is enabled and the database can search JSON arrays; pass `use_read_model` to
+        force either path (the join path doubles as its consistency check).
         """
         # Prefetch related fields for optimization
-        events = Event.objects.prefetch_related("categories", "areas", "date_instances")
+        events = Event.objects.prefetch_related("categories", "areas")
 
         current_locale = Locale.get_active()
 
@@ -271,34 +342,119 @@ class Event(TranslatableMixin, ClusterableModel):
             archive=False, locale=current_locale
         )  # Ensure to filter by locale
 
+        if bbox:
+            events = geo.filter_within_bbox(events, *bbox, locale=current_locale)
+
+        if use_read_model is None:
+            use_read_model = Event.can_use_read_model(
+                categories=categories, start_date=start_date, end_date=end_date, areas=areas
+            )
+
+        if use_read_model:
+            events = events.filter(
+                pk__in=Event.filter_occurrences(
+                    current_locale, categories, start_date, end_date, areas
+                ).values("event_id")
+            )
+        else:
+            events = Event.filter_by_joins(events, categories, start_date, end_date, areas)
+
+        # Answered from the (event_id, date) unique index without touching the table
+        next_occurrence = EventDateInstance.objects.filter(
+            event_id=OuterRef("pk"), date__gte=start_date or timezone.localdate()
+        )
+        if end_date:
+            next_occurrence = next_occurrence.filter(date__lte=end_date)
+        events = events.annotate(
+            next_occurrence=Subquery(
+                next_occurrence.order_by("date").values("date")[:1]
+            )
+        )
+
+        return events
+
+    @staticmethod
+    def filter_by_joins(events, categories, start_date, end_date, areas):
+        """
+        Apply the listing filters against the source tables.
+        """
+        # Each filter is a correlated EXISTS, so events are never multiplied by the
+        # joined rows and no DISTINCT is needed
+
         # Filter by categories (if provided)
         if categories:
-            events = events.filter(categories__in=categories).distinct()
+            events = events.filter(
+                Exists(
+                    Event.categories.through.objects.filter(
+                        event_id=OuterRef("pk"), eventscategory__in=categories
+                    )
+                )
+            )
 
         # Filter by date range (if provided)
         if start_date or end_date:
-            date_filter = Q()
+            date_instances = EventDateInstance.objects.filter(event_id=OuterRef("pk"))
             if start_date:
-                date_filter &= Q(date_instances__date__gte=start_date)
+                date_instances = date_instances.filter(date__gte=start_date)
             if end_date:
-                date_filter &= Q(date_instances__date__lte=end_date)
-            events = events.filter(date_filter).distinct()
+                date_instances = date_instances.filter(date__lte=end_date)
+            events = events.filter(Exists(date_instances))
+
+        # Filter by areas (if provided)
+        if areas:
+            area_keys = [area.translation_key for area in areas]
+            events = events.filter(
+                Exists(
+                    Event.areas.through.objects.filter(
+                        event_id=OuterRef("pk"),
+                        eventarea__translation_key__in=area_keys,
+                    )
+                )
+            )
 
-        # if start_date or end_date:
-        #     date_filter = {}
-        #     if start_date:
-        #         date_filter["date_instances__date__gte"] = start_date
-        #     if end_date:
-        #         date_filter["date_instances__date__lte"] = end_date
+        return events
 
-        #     events = events.filter(**date_filter).distinct()
-        # # Filter by areas (if provided)
+    @staticmethod
+    def filter_occurrences(locale, categories, start_date, end_date, areas):
+        """
+        Return the `EventOccurrence` rows matching the listing filters.
+        """
+        occurrences = EventOccurrence.objects.filter(locale=locale, archive=False)
+        if start_date:
+            occurrences = occurrences.filter(date__gte=start_date)
+        if end_date:
+            occurrences = occurrences.filter(date__lte=end_date)
 
+        # An event matches if it has any of the categories and any of the areas
+        if categories:
+            category_filter = Q()
+            for category in categories:
+                category_filter |= Q(category_ids__contains=[category.pk])
+            occurrences = occurrences.filter(category_filter)
         if areas:
-            area_keys = areas.values_list("translation_key", flat=True)
-            events = events.filter(areas__translation_key__in=area_keys).distinct()
+            area_filter = Q()
+            for area in areas:
+                area_filter |= Q(area_keys__contains=[str(area.translation_key)])
+            occurrences = occurrences.filter(area_filter)
 
-        return events
+        return occurrences
+
+    @staticmethod
+    def can_use_read_model(categories=None, start_date=None, end_date=None, areas=None):
+        """
+        Whether `get_filtered_events` can answer these filters from `EventOccurrence`.
+
+        Only date-filtered queries qualify: events without any date instance have no
+        occurrence rows, but are still listed when no date is given.
+        """
+        from .occurrences import read_model_enabled
+
+        if not (start_date or end_date) or not read_model_enabled():
+            return False
+        if categories or areas:
+            using = router.db_for_read(EventOccurrence)
+            return connections[using].features.supports_json_field_contains
+        return True
 
     def ordered_areas(self):
         return self.areas.order_by("name")
@@ -306,6 +462,10 @@ class Event(TranslatableMixin, ClusterableModel):
     class Meta(TranslatableMixin.Meta):
         verbose_name = "Event"
         verbose_name_plural = "Events"
+        indexes = [
+            models.Index(fields=["lat", "lng"]),  # Bounding box filters
+            models.Index(fields=["locale", "geo_cell"]),  # Map viewport and nearby
+        ]
 
 
 class EventDate(models.Model):
@@ -323,11 +483,14 @@ class EventDate(models.Model):
         end_date (DateField): The optional end date of the recurrence.
         frequency (IntegerField): The frequency of recurrence, chosen from FREQUENCY_CHOICES.
         interval (PositiveIntegerField): The interval for the recurrence (e.g., every 1 week).
+        open_ended (BooleanField): Whether the recurrence repeats indefinitely when no end
+            date is set.
         panels (list): List of Wagtail admin panels for managing the model fields.
 
     Methods:
-        generate_dates():
-            Generates a list of dates based on the recurrence rule.
+        generate_dates(until=None):
+            Generates a list of dates based on the recurrence rule, stopping at the
+            materialisation horizon (or `until`).
             Handles cases where start_date or end_date is missing or invalid.
             Returns:
                 list: A list of datetime.date objects representing the recurrence dates.
@@ -343,10 +506,10 @@ class EventDate(models.Model):
 
     # 🔹 Define frequency constants at the class level
 
-    DAILY = 3
-    WEEKLY = 2
-    MONTHLY = 1
-    YEARLY = 0
+    DAILY = recurrence.DAILY
+    WEEKLY = recurrence.WEEKLY
+    MONTHLY = recurrence.MONTHLY
+    YEARLY = recurrence.YEARLY
 
     FREQUENCY_CHOICES = [
         (DAILY, "Daily"),
@@ -368,46 +531,41 @@ class EventDate(models.Model):
     interval = models.PositiveIntegerField(
         default=1, help_text="Interval for the recurrence (e.g., every 1 week)."
     )
+    open_ended = models.BooleanField(
+        default=False,
+        help_text="Keep repeating with no end date. Ignored when an end date is set.",
+    )
 
     panels = [
         FieldPanel("start_date"),
         FieldPanel("end_date"),
+        FieldPanel("open_ended"),
         FieldPanel("frequency"),
         FieldPanel("interval"),
     ]
 
-    def generate_dates(self):
+    def generate_dates(self, until=None):
         """
         Generate dates based on the recurrence rule.
         Handles missing or invalid start/end dates gracefully.
-        """
-        if not self.start_date:
-            return []  # No start date; return an empty list
-
-        if not self.end_date:
-            return [self.start_date]  # No end date; return only the start_date
 
-        if self.end_date < self.start_date:
-            return [self.start_date]  # Invalid range; fallback to start_date
-
-        # Generate recurrence dates
-        rule = rrule(
-            freq=self.frequency,
-            dtstart=self.start_date,
-            until=self.end_date,
-            interval=self.interval,
+        Occurrences are only generated up to `until`, which defaults to the rolling
+        materialisation horizon; `extend_event_occurrences` moves it forward.
+        """
+        if until is None:
+            from .occurrences import get_occurrence_horizon
+
+            until = get_occurrence_horizon()
+
+        return recurrence.expand_rule(
+            self.start_date,
+            self.end_date,
+            self.frequency,
+            self.interval,
+            self.open_ended,
+            until,
         )
 
-        dates = list(rule)
-        # print(f"Frequency: {self.frequency}")
-        # print(f"Interval: {self.interval}")
-        # print(f"Start Date: {self.start_date}")
-        # print(f"End Date: {self.end_date}")
-        for date in dates:
-            print(f"Generated date: {date}")  # Debugging output
-        return dates
-        # return list(rule)
-
     def __str__(self):
         return f"{self.event} - {self.start_date} to {self.end_date} (Freq: {self.get_frequency_display()})"
 
@@ -456,6 +614,46 @@ class EventDateInstance(models.Model):
         return f"{self.event.title} - {self.date}"
 
 
+class EventOccurrence(models.Model):
+    """
+    A flat, denormalised copy of `EventDateInstance` used to answer listing filters.
+
+    Each row carries everything `Event.get_filtered_events` filters on, so a filtered
+    date range can be answered from this table alone instead of joining the event, its
+    many-to-many tables and its date instances. Rows are kept in step by the occurrence
+    refresh when `WISS_EVENT_OCCURRENCE_READ_MODEL` is enabled; the
+    `check_event_occurrences` command reports (and repairs) drift.
+
+    Attributes:
+        event (ForeignKey): The event the occurrence belongs to.
+        date (DateField): The date of the occurrence.
+        locale (ForeignKey): The event's locale.
+        archive (BooleanField): Whether the event is archived.
+        category_ids (JSONField): The ids of the event's categories.
+        area_keys (JSONField): The translation keys of the event's areas, as strings.
+    """
+
+    event = models.ForeignKey(
+        "Event", on_delete=models.CASCADE, related_name="occurrences"
+    )
+    date = models.DateField()
+    locale = models.ForeignKey(Locale, on_delete=models.CASCADE, related_name="+")
+    archive = models.BooleanField(default=False)
+    category_ids = models.JSONField(default=list)
+    area_keys = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["locale", "archive", "date"]),
+        ]
+        unique_together = ("event", "date")
+        verbose_name = "Event occurrence"
+        verbose_name_plural = "Event occurrences"
+
+    def __str__(self):
+        return f"{self.event_id} - {self.date}"
+
+
 # class Menu(ClusterableModel):
 #     """
 #     Represents a flat menu that can be used to organise and display navigation items.
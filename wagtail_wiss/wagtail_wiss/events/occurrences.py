@@ -0,0 +1,384 @@
+import hashlib
+import json
+import logging
+import threading
+import weakref
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT / DELETE when syncing EventDateInstance
+OCCURRENCE_BATCH_SIZE = 500
+
+# How far ahead recurring events are expanded into date instances (about 18 months)
+DEFAULT_HORIZON_DAYS = 548
+
+# The `_RefreshBatch` waiting for the current transaction to commit, per database
+# alias. Connections are per thread, so the queue is too.
+_state = threading.local()
+
+
+def read_model_enabled():
+    """
+    Whether the `EventOccurrence` read model is maintained and used for filtering
+    (`WISS_EVENT_OCCURRENCE_READ_MODEL`).
+    """
+    return getattr(settings, "WISS_EVENT_OCCURRENCE_READ_MODEL", False)
+
+
+def get_occurrence_horizon(today=None):
+    """
+    Return the last date recurring events are materialised up to
+    (`WISS_EVENT_OCCURRENCE_HORIZON_DAYS` from today).
+    """
+    today = today or timezone.localdate()
+    days = getattr(settings, "WISS_EVENT_OCCURRENCE_HORIZON_DAYS", DEFAULT_HORIZON_DAYS)
+    return today + timedelta(days=days)
+
+
+def get_rules_fingerprint(event_dates):
+    """
+    Return a digest of the recurrence rules, used to skip refreshes that cannot change anything.
+    """
+    rules = sorted(
+        [
+            str(event_date.start_date),
+            str(event_date.end_date),
+            event_date.frequency,
+            event_date.interval,
+            event_date.open_ended,
+        ]
+        for event_date in event_dates
+    )
+    return hashlib.sha256(json.dumps(rules).encode("utf-8")).hexdigest()
+
+
+def sync_date_instances(events, until=None, using=None):
+    """
+    Bring the `EventDateInstance` rows of several events in line with their rules.
+
+    Existing rows for all the events are read in one query; missing dates are inserted
+    and stale rows deleted in batches.
+
+    Args:
+        events (list): Events with their `event_dates` ideally prefetched.
+        until (date): The last date to generate; defaults to the materialisation horizon.
+        using (str): The database alias to write to.
+
+    Returns:
+        dict: The number of rows "added" and "removed".
+    """
+    from .models import EventDateInstance
+
+    events = list(events)
+    if not events:
+        return {"added": 0, "removed": 0}
+
+    using = using or router.db_for_write(EventDateInstance)
+    until = until or get_occurrence_horizon()
+
+    existing = {event.pk: {} for event in events}
+    for pk, event_id, d in (
+        EventDateInstance.objects.using(using)
+        .filter(event_id__in=existing)
+        .values_list("pk", "event_id", "date")
+    ):
+        existing[event_id][d] = pk
+
+    to_add = []
+    to_remove = []
+    for event in events:
+        wanted = event.get_occurrence_dates(until=until)
+        current = existing[event.pk]
+        to_add.extend(
+            EventDateInstance(event=event, date=d)
+            for d in sorted(wanted - current.keys())
+        )
+        to_remove.extend(pk for d, pk in current.items() if d not in wanted)
+
+    with transaction.atomic(using=using):
+        for start in range(0, len(to_remove), OCCURRENCE_BATCH_SIZE):
+            EventDateInstance.objects.using(using).filter(
+                pk__in=to_remove[start : start + OCCURRENCE_BATCH_SIZE]
+            ).delete()
+
+        EventDateInstance.objects.using(using).bulk_create(
+            to_add, batch_size=OCCURRENCE_BATCH_SIZE, ignore_conflicts=True
+        )
+
+    result = {"added": len(to_add), "removed": len(to_remove)}
+    logger.info(
+        "Refreshed date instances for %d event(s): %d added, %d removed",
+        len(events),
+        result["added"],
+        result["removed"],
+    )
+    return result
+
+
+def refresh_occurrences(event_ids, force=False, until=None, using=None):
+    """
+    Regenerate the date instances of the given events in one batch, up to `until`
+    (the materialisation horizon by default).
+
+    Events whose stored rules fingerprint matches their current rules are skipped
+    unless `force` is set.
+
+    Returns:
+        dict: The number of rows "added" and "removed", and events "refreshed" and "skipped".
+    """
+    from .models import Event
+
+    using = using or router.db_for_write(Event)
+    until = until or get_occurrence_horizon()
+    events = Event.objects.using(using).filter(pk__in=event_ids).prefetch_related(
+        "event_dates"
+    )
+
+    dirty = []
+    skipped = 0
+    for event in events:
+        fingerprint = get_rules_fingerprint(event.event_dates.all())
+        if not force and fingerprint == event.occurrence_fingerprint:
+            skipped += 1
+            continue
+        event.occurrence_fingerprint = fingerprint
+        event.occurrences_materialised_until = until
+        dirty.append(event)
+
+    with transaction.atomic(using=using):
+        result = sync_date_instances(dirty, until=until, using=using)
+        Event.objects.using(using).bulk_update(
+            dirty,
+            ["occurrence_fingerprint", "occurrences_materialised_until"],
+            batch_size=OCCURRENCE_BATCH_SIZE,
+        )
+        # Skipped events may still have changed locale, archive state or categories
+        if read_model_enabled():
+            sync_read_model(event_ids, using=using)
+
+    # Feeds show the events' fields as well as their dates, so they go stale even
+    # when no rows changed. Bumped once the rows are visible, or a feed could cache
+    # the old ones
+    if event_ids:
+        from .feeds import events_version
+
+        transaction.on_commit(events_version.bump, using=using)
+
+    result.update(refreshed=len(dirty), skipped=skipped)
+    return result
+
+
+def _diff_read_model(event_ids, using):
+    """
+    Compare the `EventOccurrence` rows of the given events with their source tables.
+
+    Returns:
+        tuple: (rows to insert, pks of rows to delete, {event id: attributes} for
+            events whose remaining rows need updating)
+    """
+    from .models import Event, EventDateInstance, EventOccurrence
+
+    event_ids = list(event_ids)
+
+    attributes = {
+        pk: {
+            "locale_id": locale_id,
+            "archive": archive,
+            "category_ids": [],
+            "area_keys": [],
+        }
+        for pk, locale_id, archive in Event.objects.using(using)
+        .filter(pk__in=event_ids)
+        .values_list("pk", "locale_id", "archive")
+    }
+    for event_id, category_id in (
+        Event.categories.through.objects.using(using)
+        .filter(event_id__in=event_ids)
+        .values_list("event_id", "eventscategory_id")
+    ):
+        attributes[event_id]["category_ids"].append(category_id)
+    for event_id, key in (
+        Event.areas.through.objects.using(using)
+        .filter(event_id__in=event_ids)
+        .values_list("event_id", "eventarea__translation_key")
+    ):
+        attributes[event_id]["area_keys"].append(str(key))
+    for attrs in attributes.values():
+        attrs["category_ids"].sort()
+        attrs["area_keys"].sort()
+
+    wanted = {pk: set() for pk in attributes}
+    for event_id, d in (
+        EventDateInstance.objects.using(using)
+        .filter(event_id__in=event_ids)
+        .values_list("event_id", "date")
+    ):
+        wanted[event_id].add(d)
+
+    to_delete = []
+    stale = {}
+    existing = {pk: set() for pk in attributes}
+    for pk, event_id, d, locale_id, archive, category_ids, area_keys in (
+        EventOccurrence.objects.using(using)
+        .filter(event_id__in=event_ids)
+        .values_list(
+            "pk", "event_id", "date", "locale_id", "archive", "category_ids", "area_keys"
+        )
+    ):
+        if d not in wanted.get(event_id, ()):
+            to_delete.append(pk)
+            continue
+        existing[event_id].add(d)
+        row = {
+            "locale_id": locale_id,
+            "archive": archive,
+            "category_ids": category_ids,
+            "area_keys": area_keys,
+        }
+        if row != attributes[event_id]:
+            stale[event_id] = attributes[event_id]
+
+    to_add = [
+        EventOccurrence(event_id=event_id, date=d, **attributes[event_id])
+        for event_id, dates in wanted.items()
+        for d in sorted(dates - existing[event_id])
+    ]
+    return to_add, to_delete, stale
+
+
+def sync_read_model(event_ids, using=None):
+    """
+    Bring the `EventOccurrence` rows of the given events in line with their date
+    instances, locale, archive state, categories and areas.
+
+    Returns:
+        dict: The number of rows "added" and "removed", and events "updated".
+    """
+    from .models import EventOccurrence
+
+    using = using or router.db_for_write(EventOccurrence)
+    to_add, to_delete, stale = _diff_read_model(event_ids, using)
+
+    with transaction.atomic(using=using):
+        for start in range(0, len(to_delete), OCCURRENCE_BATCH_SIZE):
+            EventOccurrence.objects.using(using).filter(
+                pk__in=to_delete[start : start + OCCURRENCE_BATCH_SIZE]
+            ).delete()
+        for event_id, attrs in stale.items():
+            EventOccurrence.objects.using(using).filter(event_id=event_id).update(**attrs)
+        EventOccurrence.objects.using(using).bulk_create(
+            to_add, batch_size=OCCURRENCE_BATCH_SIZE, ignore_conflicts=True
+        )
+
+    return {"added": len(to_add), "removed": len(to_delete), "updated": len(stale)}
+
+
+def find_read_model_drift(event_ids, using=None):
+    """
+    Return the ids of events whose `EventOccurrence` rows disagree with the source tables.
+    """
+    from .models import EventOccurrence
+
+    using = using or router.db_for_read(EventOccurrence)
+    to_add, to_delete, stale = _diff_read_model(event_ids, using)
+
+    drift = {row.event_id for row in to_add} | set(stale)
+    if to_delete:
+        drift.update(
+            EventOccurrence.objects.using(using)
+            .filter(pk__in=to_delete)
+            .values_list("event_id", flat=True)
+        )
+    return drift
+
+
+def get_events_behind_horizon(until=None):
+    """
+    Return the ids of events with rules that continue past the date their instances
+    were materialised up to, but not yet up to `until`.
+    """
+    from .models import Event, EventDate
+
+    until = until or get_occurrence_horizon()
+    behind = Q(occurrences_materialised_until__isnull=True) | Q(
+        occurrences_materialised_until__lt=until
+    )
+    continues = EventDate.objects.filter(event=OuterRef("pk")).filter(
+        Q(end_date__isnull=True, open_ended=True)
+        | Q(end_date__gt=OuterRef("occurrences_materialised_until"))
+        | Q(event__occurrences_materialised_until__isnull=True)
+    )
+    return (
+        Event.objects.filter(behind)
+        .filter(Exists(continues))
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+class _RefreshBatch:
+    """
+    The events to refresh when the current transaction on one database commits.
+
+    Its `flush` is registered with `on_commit`, and that registration is the only
+    strong reference to the batch; the queue keeps a weak one. If the transaction,
+    or the savepoint the batch was started in, rolls back, Django discards the
+    callback and the batch and its queued ids go with it, so the next event
+    scheduled starts a new batch.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.event_ids = set()
+        self.flushed = False
+
+    def flush(self):
+        self.flushed = True
+        if self.event_ids:
+            refresh_occurrences(self.event_ids, using=self.using)
+
+
+def _get_batch(using):
+    """
+    Return the batch waiting on the current transaction, starting one if needed.
+    """
+    batches = _state.__dict__.setdefault("batches", {})
+    ref = batches.get(using)
+    batch = ref() if ref is not None else None
+    if batch is None or batch.flushed:
+        batch = _RefreshBatch(using)
+        batches[using] = weakref.ref(batch)
+        transaction.on_commit(batch.flush, using=using)
+    return batch
+
+
+def schedule_occurrence_refresh(event, using=None):
+    """
+    Queue an event's date instances to be regenerated when the transaction commits.
+
+    However many times an event is scheduled in one transaction, and however many
+    events are, a single batched refresh runs at commit. Outside a transaction the
+    refresh runs immediately, as `on_commit` would.
+    """
+    schedule_occurrence_refresh_for_ids([event.pk], using=using)
+
+
+def schedule_occurrence_refresh_for_ids(event_ids, using=None):
+    """
+    Queue several events by id; see `schedule_occurrence_refresh`.
+    """
+    from .models import Event
+
+    using = using or router.db_for_write(Event)
+
+    if not connections[using].in_atomic_block:
+        refresh_occurrences(event_ids, using=using)
+        return
+
+    _get_batch(using).event_ids.update(event_ids)
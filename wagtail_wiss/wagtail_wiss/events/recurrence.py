@@ -0,0 +1,115 @@
+"""
+Expansion of `EventDate` recurrence rules into dates.
+
+The rules used by events are simple enough to expand with date arithmetic rather
+than `dateutil.rrule`, which builds a datetime per occurrence and checks each one
+against the rule. The results match rrule exactly, including its handling of days
+that do not exist in every month or year: a rule starting on the 31st skips months
+with fewer days, and one starting on 29 February only occurs in leap years.
+"""
+
+from calendar import monthrange
+from datetime import date
+
+# The same values as dateutil.rrule's frequency constants
+YEARLY = 0
+MONTHLY = 1
+WEEKLY = 2
+DAILY = 3
+
+
+def _expand_days(start, until, step):
+    # map() keeps the loop in C, about twice as fast as a comprehension here
+    return list(
+        map(date.fromordinal, range(start.toordinal(), until.toordinal() + 1, step))
+    )
+
+
+def _expand_months(start, until, interval):
+    dates = []
+    first = start.year * 12 + start.month - 1
+    last = until.year * 12 + until.month - 1
+    for index in range(first, last + 1, interval):
+        year, month = divmod(index, 12)
+        month += 1
+        if start.day <= monthrange(year, month)[1]:
+            dates.append(date(year, month, start.day))
+
+    # The last month may run past `until`
+    if dates and dates[-1] > until:
+        dates.pop()
+    return dates
+
+
+def _expand_years(start, until, interval):
+    dates = []
+    for year in range(start.year, until.year + 1, interval):
+        if start.day <= monthrange(year, start.month)[1]:
+            dates.append(date(year, start.month, start.day))
+
+    if dates and dates[-1] > until:
+        dates.pop()
+    return dates
+
+
+def _expand_rrule(start, until, frequency, interval):
+    from dateutil.rrule import rrule
+
+    rule = rrule(freq=frequency, dtstart=start, until=until, interval=interval)
+    return [occurrence.date() for occurrence in rule]
+
+
+def expand(start, until, frequency, interval=1):
+    """
+    Return the dates a recurrence rule produces from `start` up to and including `until`.
+
+    Args:
+        start (date): The first occurrence.
+        until (date): The last date an occurrence may fall on.
+        frequency (int): One of YEARLY, MONTHLY, WEEKLY or DAILY.
+        interval (int): The number of periods between occurrences.
+
+    Returns:
+        list: `date` objects in ascending order.
+    """
+    if until < start:
+        return []
+
+    interval = max(interval or 1, 1)
+
+    if frequency == DAILY:
+        return _expand_days(start, until, interval)
+    if frequency == WEEKLY:
+        return _expand_days(start, until, 7 * interval)
+    if frequency == MONTHLY:
+        return _expand_months(start, until, interval)
+    if frequency == YEARLY:
+        return _expand_years(start, until, interval)
+
+    # Anything else rrule understands (hourly and finer are not offered in the admin)
+    return _expand_rrule(start, until, frequency, interval)
+
+
+def expand_rule(start_date, end_date, frequency, interval, open_ended, until):
+    """
+    Return the dates of an `EventDate` rule, handling missing or invalid dates the way
+    the admin expects. Takes plain values so it can run outside the ORM, e.g. in a
+    worker process.
+
+    Occurrences are only generated up to `until`, the materialisation horizon.
+    """
+    if not start_date:
+        return []  # No start date; return an empty list
+
+    if not end_date and not open_ended:
+        return [start_date]  # No end date; return only the start_date
+
+    if end_date and end_date < start_date:
+        return [start_date]  # Invalid range; fallback to start_date
+
+    end_date = min(end_date, until) if end_date else until
+
+    if end_date < start_date:
+        return [start_date]  # Starts beyond the horizon; keep the first date
+
+    return expand(start_date, end_date, frequency, interval)
@@ -0,0 +1,80 @@
+"""
+The image rendition used by the events listing, generated ahead of time.
+
+Wagtail creates a missing rendition while the page that asks for it waits. Events
+queue theirs when their image changes instead, and the work runs after the commit
+in a small thread pool, so visitors find it already made.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from wagtail.images import get_image_model
+
+logger = logging.getLogger(__name__)
+
+# Must match the filter spec of the `{% image %}` tag in blocks/events.html
+LISTING_IMAGE_FILTER = "fill-300x200"
+
+DEFAULT_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "WISS_RENDITION_WORKERS", DEFAULT_WORKERS),
+                thread_name_prefix="wiss-renditions",
+            )
+        return _executor
+
+
+def get_listing_images():
+    """
+    Return an image queryset that prefetches the listing rendition, for use in
+    `Prefetch("image", ...)`.
+    """
+    return get_image_model().objects.prefetch_renditions(LISTING_IMAGE_FILTER)
+
+
+def generate_listing_rendition(image_id):
+    """
+    Create the listing rendition of an image, if it does not exist yet.
+    """
+    try:
+        image = get_image_model().objects.get(pk=image_id)
+        image.get_rendition(LISTING_IMAGE_FILTER)
+    except Exception:
+        logger.exception(
+            "Could not generate the listing rendition of image %s", image_id
+        )
+
+
+def _generate_in_background(image_id):
+    try:
+        generate_listing_rendition(image_id)
+    finally:
+        # Connections belong to the worker thread; do not leave them open
+        connections.close_all()
+
+
+def schedule_listing_rendition(image_id):
+    """
+    Generate the listing rendition of an image in the background once the current
+    transaction commits. With `WISS_BACKGROUND_RENDITIONS = False` it is generated
+    in the calling thread instead, still after the commit.
+    """
+    if getattr(settings, "WISS_BACKGROUND_RENDITIONS", True):
+        transaction.on_commit(
+            lambda: get_executor().submit(_generate_in_background, image_id)
+        )
+    else:
+        transaction.on_commit(lambda: generate_listing_rendition(image_id))
@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import run_ocr_on_image
+from .views import events_geojson, events_ical, run_ocr_on_image
 
 urlpatterns = [
     path('run-ocr/', run_ocr_on_image, name='run_ocr'),
+    path('events.geojson', events_geojson, name='events_geojson'),
+    path('events.ics', events_ical, name='events_ical'),
 ]
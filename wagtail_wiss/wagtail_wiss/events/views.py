@@ -1,12 +1,28 @@
-import pytesseract
-from wagtail.images import get_image_model
-from PIL import Image as PilImage
-import requests
+from datetime import date
 from io import BytesIO
-from django.http import JsonResponse
+
+from wagtail.coreutils import get_supported_content_language_variant
+from wagtail.images import get_image_model
+from wagtail.models import Locale
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone, translation
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_safe
 from django.contrib.admin.views.decorators import staff_member_required
 
+from wagtail_wiss.shared_utils.catalogue import get_active_language
+
+from . import feeds, geo, ical
+from .catalogues import get_labels, translate_areas, translate_categories
+from .models import Event, EventsCategory
+from .occurrences import get_occurrence_horizon
+
+GEOJSON_CONTENT_TYPE = "application/geo+json"
+ICAL_CONTENT_TYPE = "text/calendar; charset=utf-8"
+
 @csrf_exempt
 @staff_member_required
 def run_ocr_on_image(request):
@@ -18,6 +34,11 @@ def run_ocr_on_image(request):
         if not image_id:
             return JsonResponse({'error': 'Missing image_id'}, status=400)
 
+        # OCR and HTTP libraries are only loaded when OCR is actually requested
+        import pytesseract
+        import requests
+        from PIL import Image as PilImage
+
         try:
             ImageModel = get_image_model()
             img_obj = ImageModel.objects.get(id=image_id)
@@ -32,3 +53,228 @@ def run_ocr_on_image(request):
             return JsonResponse({'error': str(e)}, status=500)
 
     return JsonResponse({'error': 'Invalid request method'}, status=405)
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _parse_ids(values):
+    return [int(value) for value in values if value.isdigit()]
+
+
+def _get_filters(language_code, category_ids, area_ids):
+    """
+    Translate category and area ids into the locale's instances. Returns None when
+    ids were given but none of them exist, so that nothing matches.
+    """
+    categories = translate_categories(
+        EventsCategory.objects.filter(pk__in=category_ids), language_code
+    )
+    areas = translate_areas(area_ids, language_code)
+    if (category_ids and not categories) or (area_ids and not areas):
+        return None
+    return categories, areas
+
+
+def _get_language(request):
+    try:
+        return get_supported_content_language_variant(
+            request.GET.get("language") or get_active_language()
+        )
+    except LookupError:
+        return get_active_language()
+
+
+@require_safe
+def events_geojson(request):
+    """
+    Return the events matching the listing filters inside a map viewport, as GeoJSON.
+
+    Query parameters: `bbox` ("west,south,east,north", required), `zoom` (the map's
+    zoom level), `start_date` and `end_date` (ISO dates), `areas` and `categories`
+    (ids, repeatable), `near` ("lat,lng") and `radius` (kilometres), and `language`
+    (defaults to the active one).
+
+    Below `WISS_EVENT_CLUSTER_MAX_ZOOM`, nearby events are returned as clusters. The
+    box is widened to the cluster grid (or the spatial grid without clustering) so
+    nearby views share a cached body, and the response carries an ETag for
+    revalidation.
+    """
+    bbox = feeds.parse_bbox(request.GET.get("bbox"))
+    if bbox is None:
+        return JsonResponse({"error": "Missing or invalid bbox"}, status=400)
+
+    zoom = request.GET.get("zoom", "")
+    zoom = int(zoom) if zoom.isdigit() else None
+    if zoom is not None and zoom < geo.get_cluster_max_zoom():
+        bbox = feeds.snap_bbox(bbox, geo.get_cluster_size(zoom))
+    else:
+        zoom = None
+        bbox = feeds.snap_bbox(bbox, geo.get_cell_size())
+
+    language_code = _get_language(request)
+
+    start_date = _parse_date(request.GET.get("start_date"))
+    end_date = _parse_date(request.GET.get("end_date"))
+    area_ids = sorted(_parse_ids(request.GET.getlist("areas")))
+    category_ids = sorted(_parse_ids(request.GET.getlist("categories")))
+
+    # Parsed as the listing does, so the map shows the events the list does
+    near = geo.parse_point(request.GET.get("near"))
+    radius = geo.parse_radius(request.GET.get("radius")) if near else None
+
+    key = feeds.make_feed_key(
+        "geojson",
+        language_code,
+        [bbox, zoom, start_date, end_date, area_ids, category_ids, near, radius],
+    )
+    etag = f'"{key}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        cache_key = f"wiss:events:geojson:{key}"
+        cached = feeds.get_cached(cache_key)
+        if cached is not None:
+            response = HttpResponse(cached[0], content_type=GEOJSON_CONTENT_TYPE)
+        else:
+            response = StreamingHttpResponse(
+                feeds.cached_stream(
+                    cache_key,
+                    _iter_events_geojson(
+                        language_code,
+                        bbox,
+                        zoom,
+                        start_date,
+                        end_date,
+                        area_ids,
+                        category_ids,
+                        near,
+                        radius,
+                    ),
+                ),
+                content_type=GEOJSON_CONTENT_TYPE,
+            )
+
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=feeds.FEED_MAX_AGE)
+    return response
+
+
+def _iter_events_geojson(
+    language_code,
+    bbox,
+    zoom,
+    start_date,
+    end_date,
+    area_ids,
+    category_ids,
+    near=None,
+    radius=None,
+):
+    with translation.override(language_code):
+        filters = _get_filters(language_code, category_ids, area_ids)
+        events = Event.get_filtered_events(
+            categories=filters[0] if filters else None,
+            start_date=start_date,
+            end_date=end_date,
+            areas=filters[1] if filters else None,
+            bbox=bbox,
+        )
+        if near:
+            events = geo.filter_within_radius(
+                events, *near, radius, locale=Locale.get_active()
+            )
+        # Keep the soonest events if the collection is truncated
+        events = events.prefetch_related(None).order_by(
+            F("next_occurrence").asc(nulls_last=True), "pk"
+        )
+        if filters is None:
+            events = events.none()
+    labels = get_labels(language_code)
+    if zoom is not None:
+        return feeds.iter_clustered_geojson(events, labels, language_code, zoom)
+    return feeds.iter_geojson(events, labels, language_code)
+
+
+@require_safe
+def events_ical(request):
+    """
+    Return the upcoming events of a locale as an iCalendar feed.
+
+    Query parameters: `areas` and `categories` (ids, repeatable) and `language`
+    (defaults to the active one). Every event with a date from today on is included,
+    with one VEVENT per `EventDate` rule. The response carries an ETag and a
+    Last-Modified date, so subscribers can revalidate without the feed being rebuilt.
+    """
+    language_code = _get_language(request)
+    area_ids = sorted(_parse_ids(request.GET.getlist("areas")))
+    category_ids = sorted(_parse_ids(request.GET.getlist("categories")))
+
+    key = feeds.make_feed_key("ical", language_code, [area_ids, category_ids])
+    cache_key = f"wiss:events:ical:{key}"
+    cached = feeds.get_cached(cache_key)
+    modified = cached[1] if cached else timezone.now().replace(microsecond=0)
+
+    etag = f'"{key}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(modified.timestamp())
+    )
+    if response is None:
+        if cached is not None:
+            response = HttpResponse(cached[0], content_type=ICAL_CONTENT_TYPE)
+        else:
+            response = StreamingHttpResponse(
+                feeds.cached_stream(
+                    cache_key,
+                    _iter_events_ical(
+                        request, language_code, area_ids, category_ids, modified
+                    ),
+                    modified,
+                ),
+                content_type=ICAL_CONTENT_TYPE,
+            )
+        response["Content-Disposition"] = 'inline; filename="events.ics"'
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(modified.timestamp())
+    patch_cache_control(response, public=True, max_age=feeds.FEED_MAX_AGE)
+    return response
+
+
+def _iter_events_ical(request, language_code, area_ids, category_ids, modified):
+    with translation.override(language_code):
+        filters = _get_filters(language_code, category_ids, area_ids)
+        events = (
+            Event.get_filtered_events(
+                categories=filters[0] if filters else None,
+                start_date=timezone.localdate(),
+                areas=filters[1] if filters else None,
+            )
+            .prefetch_related(None)
+            .prefetch_related("categories", "event_dates")
+            .select_related("page_link")
+            .order_by("pk")
+        )
+        if filters is None:
+            events = events.none()
+    labels = get_labels(language_code)
+
+    def get_url(event):
+        if event.url_link:
+            return event.url_link
+        if event.page_link:
+            return event.page_link.get_full_url(request)
+        return None
+
+    return ical.iter_calendar(
+        events.iterator(chunk_size=500),
+        labels.get("events_calendar", "Events"),
+        language_code,
+        request.get_host().split(":")[0],
+        modified,
+        get_occurrence_horizon(),
+        get_url,
+    )
@@ -3,7 +3,6 @@ from django.forms.widgets import (
 )  # Only for instantiation
 
 from django import forms
-from django.db import transaction
 from django.utils.translation import gettext as _
 
 from wagtail.models import Site
@@ -16,6 +15,7 @@ from core.utils.sites import filter_for_request_site
 
 #from .forms import EventAdminForm
 from .models import EventsCategory, EventArea, Event
+from .occurrences import schedule_occurrence_refresh
 
 
 class EventsCategoryViewSet(SnippetViewSet):
@@ -118,8 +118,11 @@ class EventViewSet(SnippetViewSet):
     def after_save(self, instance):
         """
         Ensure EventDateInstance table updates after the event and related objects are saved.
+
+        Event.save() has already scheduled the refresh; scheduling again is a no-op
+        within the same transaction.
         """
-        transaction.on_commit(lambda: instance.refresh_event_date_instances())
+        schedule_occurrence_refresh(instance)
         super().after_save(instance)
 
     panels = [
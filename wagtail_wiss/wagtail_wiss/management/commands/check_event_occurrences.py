@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.utils import translation
+
+from wagtail.models import Locale
+
+from wagtail_wiss.events.models import Event
+from wagtail_wiss.events.occurrences import find_read_model_drift, sync_read_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the EventOccurrence read model with the events, their date instances "
+        "and their categories and areas, and optionally repair it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Rewrite the rows of events that have drifted.",
+        )
+        parser.add_argument(
+            "--start-date",
+            help="Also compare get_filtered_events() results on both paths from this date.",
+        )
+        parser.add_argument("--end-date", help="End date for the comparison.")
+
+    def handle(self, *args, **options):
+        event_ids = list(Event.objects.order_by("pk").values_list("pk", flat=True))
+        chunk_size = max(options["chunk_size"], 1)
+
+        drifted = []
+        for start in range(0, len(event_ids), chunk_size):
+            chunk = event_ids[start : start + chunk_size]
+            drift = sorted(find_read_model_drift(chunk))
+            drifted.extend(drift)
+            if drift and options["repair"]:
+                sync_read_model(drift)
+
+        if drifted:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{len(drifted)} of {len(event_ids)} events have drifted: "
+                    + ", ".join(str(pk) for pk in drifted[:20])
+                    + (" ..." if len(drifted) > 20 else "")
+                )
+            )
+            if options["repair"]:
+                self.stdout.write(self.style.SUCCESS("Repaired."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(event_ids)} events checked, no drift."))
+
+        if options["start_date"] or options["end_date"]:
+            self.compare_filters(options["start_date"], options["end_date"])
+
+    def compare_filters(self, start_date, end_date):
+        for locale in Locale.objects.all():
+            with translation.override(locale.language_code):
+                joined = set(
+                    Event.get_filtered_events(
+                        start_date=start_date, end_date=end_date, use_read_model=False
+                    ).values_list("pk", flat=True)
+                )
+                read = set(
+                    Event.get_filtered_events(
+                        start_date=start_date, end_date=end_date, use_read_model=True
+                    ).values_list("pk", flat=True)
+                )
+            if joined == read:
+                self.stdout.write(f"{locale.language_code}: {len(joined)} events on both paths")
+            else:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"{locale.language_code}: {len(joined - read)} missing from and "
+                        f"{len(read - joined)} extra in the read model"
+                    )
+                )
@@ -0,0 +1,45 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtail_wiss.shared_utils.style_helpers import scss_class_choices
+
+
+class Command(BaseCommand):
+    help = (
+        "Parse the registered SCSS class choice sources and write them to a JSON "
+        "artefact, read in place of the SCSS files (WISS_SCSS_CLASS_CHOICES_FILE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            help="Where to write the artefact. Defaults to WISS_SCSS_CLASS_CHOICES_FILE.",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"] or getattr(
+            settings, "WISS_SCSS_CLASS_CHOICES_FILE", None
+        )
+        if not output:
+            raise CommandError(
+                "Pass --output or set WISS_SCSS_CLASS_CHOICES_FILE."
+            )
+
+        compiled = scss_class_choices.compile()
+
+        directory = os.path.dirname(os.path.abspath(output))
+        os.makedirs(directory, exist_ok=True)
+
+        # Write next to the target and rename, so a running process never reads half a file
+        tmp_path = f"{output}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(compiled, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, output)
+
+        for name, choices in sorted(compiled.items()):
+            # The "No Style" entry is always present
+            self.stdout.write(f"{name}: {len(choices) - 1} classes")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from wagtail_wiss.events.occurrences import (
+    get_events_behind_horizon,
+    get_occurrence_horizon,
+    refresh_occurrences,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the occurrence horizon forward: generate date instances up to "
+        "WISS_EVENT_OCCURRENCE_HORIZON_DAYS from today for recurring events that "
+        "continue past it. Intended to run nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many events are behind the horizon.",
+        )
+
+    def handle(self, *args, **options):
+        until = get_occurrence_horizon()
+        event_ids = list(get_events_behind_horizon(until))
+
+        self.stdout.write(f"{len(event_ids)} events to extend up to {until}")
+        if options["dry_run"] or not event_ids:
+            return
+
+        batch_size = max(options["batch_size"], 1)
+        added = removed = 0
+        for start in range(0, len(event_ids), batch_size):
+            result = refresh_occurrences(
+                event_ids[start : start + batch_size], force=True, until=until
+            )
+            added += result["added"]
+            removed += result["removed"]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Added {added} and removed {removed} date instances.")
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from wagtail.images import get_image_model
+
+from wagtail_wiss.events.models import Event
+from wagtail_wiss.events.renditions import (
+    LISTING_IMAGE_FILTER,
+    generate_listing_rendition,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        f"Generate the {LISTING_IMAGE_FILTER} listing rendition of every event image "
+        "that does not have one yet. New and changed images get theirs when the event "
+        "is saved; this covers images from before that, or renditions that were purged."
+    )
+
+    def handle(self, *args, **options):
+        images = (
+            get_image_model()
+            .objects.filter(pk__in=Event.objects.values("image_id"))
+            .exclude(renditions__filter_spec=LISTING_IMAGE_FILTER)
+            .values_list("pk", flat=True)
+        )
+        image_ids = list(images)
+
+        self.stdout.write(f"{len(image_ids)} event images without a listing rendition")
+        for image_id in image_ids:
+            generate_listing_rendition(image_id)
+
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from wagtail_wiss.events.geo import get_cell, get_cell_size
+from wagtail_wiss.events.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the spatial grid cell of every geolocated event. Run it after "
+        "changing WISS_EVENT_GEO_CELL_DEGREES, or after updating coordinates in bulk "
+        "without saving each event."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        size = get_cell_size()
+
+        events = []
+        updated = 0
+        for event in (
+            Event.objects.filter(lat__isnull=False, lng__isnull=False)
+            .only("pk", "lat", "lng", "geo_cell")
+            .iterator(chunk_size=batch_size)
+        ):
+            cell = get_cell(event.lat, event.lng, size)
+            if cell != event.geo_cell:
+                event.geo_cell = cell
+                events.append(event)
+            if len(events) >= batch_size:
+                Event.objects.bulk_update(events, ["geo_cell"])
+                updated += len(events)
+                events = []
+        Event.objects.bulk_update(events, ["geo_cell"])
+        updated += len(events)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated the grid cell of {updated} events ({size}°).")
+        )
@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from wagtail.models import Page
+
+from wagtail_wiss.shared_utils import prerender
+
+
+def _prerender_batch(page_ids):
+    """
+    Pre-render one batch of pages in a worker thread.
+
+    Returns:
+        tuple: (pages processed, fragments stored, list of (page id, error) pairs)
+    """
+    close_old_connections()
+    pages = fragments = 0
+    errors = []
+    try:
+        for page in Page.objects.filter(id__in=page_ids).specific():
+            try:
+                fragments += prerender.prerender_page(page)
+                pages += 1
+            except Exception as e:
+                errors.append((page.pk, e))
+    finally:
+        connection.close()
+    return pages, fragments, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill the pre-rendered accessible rich text for live pages. "
+        "Pages are processed in batches by a pool of worker threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--page-id",
+            type=int,
+            action="append",
+            dest="page_ids",
+            help="Only process the given page (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        if not prerender.is_enabled():
+            self.stdout.write(
+                self.style.WARNING(
+                    "WISS_PRERENDER_RICHTEXT is off; output is stored but will not be used."
+                )
+            )
+
+        page_ids = Page.objects.live().order_by("id").values_list("id", flat=True)
+        if options["page_ids"]:
+            page_ids = page_ids.filter(id__in=options["page_ids"])
+        page_ids = list(page_ids)
+
+        batch_size = max(options["batch_size"], 1)
+        batches = [
+            page_ids[i : i + batch_size] for i in range(0, len(page_ids), batch_size)
+        ]
+        self.stdout.write(f"Pre-rendering {len(page_ids)} pages in {len(batches)} batches")
+
+        total_pages = total_fragments = 0
+        with ThreadPoolExecutor(max_workers=max(options["workers"], 1)) as executor:
+            futures = [executor.submit(_prerender_batch, batch) for batch in batches]
+            for done, future in enumerate(as_completed(futures), start=1):
+                pages, fragments, errors = future.result()
+                total_pages += pages
+                total_fragments += fragments
+                for page_id, error in errors:
+                    self.stderr.write(f"Page {page_id}: {error}")
+                self.stdout.write(f"  batch {done}/{len(batches)} done")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {total_fragments} fragments for {total_pages} pages."
+            )
+        )
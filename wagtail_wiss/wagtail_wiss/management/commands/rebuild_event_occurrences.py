@@ -0,0 +1,264 @@
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from wagtail_wiss.events.feeds import events_version
+from wagtail_wiss.events.models import Event, EventDate, EventDateInstance
+from wagtail_wiss.events.occurrences import (
+    OCCURRENCE_BATCH_SIZE,
+    get_occurrence_horizon,
+    get_rules_fingerprint,
+    read_model_enabled,
+    sync_read_model,
+)
+from wagtail_wiss.events.recurrence import expand_rule
+
+RULE_FIELDS = (
+    "event_id",
+    "start_date",
+    "end_date",
+    "frequency",
+    "interval",
+    "open_ended",
+)
+
+
+def _expand_chunk(rules, until):
+    """
+    Expand the rules of one chunk of events in a worker process.
+
+    Args:
+        rules (list): (event id, start date, end date, frequency, interval, open ended) tuples.
+        until (date): The materialisation horizon.
+
+    Returns:
+        dict: Event id to the set of its dates.
+    """
+    dates = {}
+    for event_id, *rule in rules:
+        dates.setdefault(event_id, set()).update(expand_rule(*rule, until))
+    return dates
+
+
+def _iter_chunks(queryset, chunk_size):
+    chunk = []
+    for pk in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(pk)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _copy_rows(rows):
+    """
+    Insert (event id, date) rows with PostgreSQL's COPY.
+    """
+    qn = connection.ops.quote_name
+    opts = EventDateInstance._meta
+    sql = "COPY {} ({}, {}) FROM STDIN".format(
+        qn(opts.db_table),
+        qn(opts.get_field("event").column),
+        qn(opts.get_field("date").column),
+    )
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy"):  # psycopg 3
+            with raw.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:  # psycopg2
+            buffer = io.StringIO(
+                "".join(f"{event_id}\t{d.isoformat()}\n" for event_id, d in rows)
+            )
+            raw.copy_expert(sql, buffer)
+
+
+def _write_rows(rows):
+    if connection.vendor == "postgresql":
+        _copy_rows(rows)
+    else:
+        EventDateInstance.objects.bulk_create(
+            [EventDateInstance(event_id=event_id, date=d) for event_id, d in rows],
+            batch_size=OCCURRENCE_BATCH_SIZE,
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenerate the date instances of every event. Event ids are read in chunks, "
+        "the rules are expanded in a pool of worker processes, and each chunk is "
+        "written in its own transaction (with COPY on PostgreSQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            "--state-file",
+            default=".rebuild_event_occurrences.json",
+            help="Where the last completed chunk is recorded.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue after the last chunk recorded in the state file.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Expand the rules and report what would change without writing.",
+        )
+
+    def read_state(self, path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"No state file at {path}; run without --resume first.")
+
+    def write_state(self, path, state):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def handle(self, *args, **options):
+        chunk_size = max(options["chunk_size"], 1)
+        state_file = options["state_file"]
+        dry_run = options["dry_run"]
+
+        if options["resume"]:
+            state = self.read_state(state_file)
+            until = date.fromisoformat(state["until"])
+            last_pk = state["last_pk"]
+        else:
+            until = get_occurrence_horizon()
+            last_pk = 0
+
+        event_ids = Event.objects.filter(pk__gt=last_pk).order_by("pk")
+        total = event_ids.count()
+        event_ids = event_ids.values_list("pk", flat=True)
+
+        self.stdout.write(
+            f"{'Checking' if dry_run else 'Rebuilding'} {total} events up to {until}"
+            + (f", resuming after event {last_pk}" if last_pk else "")
+        )
+
+        stats = {"events": 0, "rules": 0, "rows": 0, "added": 0, "removed": 0}
+        started = time.monotonic()
+        workers = max(options["workers"], 1)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Keep a bounded window of chunks in flight so ids are streamed, not loaded
+            pending = deque()
+            chunks = _iter_chunks(event_ids, chunk_size)
+
+            def submit_next():
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return False
+                rules = list(
+                    EventDate.objects.filter(event_id__in=chunk).values_list(
+                        *RULE_FIELDS
+                    )
+                )
+                future = executor.submit(_expand_chunk, rules, until)
+                pending.append((chunk, rules, future))
+                return True
+
+            for _ in range(workers * 2):
+                if not submit_next():
+                    break
+
+            while pending:
+                chunk, rules, future = pending.popleft()
+                dates = future.result()
+                self.process_chunk(chunk, rules, dates, until, stats, dry_run)
+
+                if not dry_run:
+                    self.write_state(
+                        state_file, {"until": until.isoformat(), "last_pk": chunk[-1]}
+                    )
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"  {stats['events']}/{total} events, {stats['rows']} dates "
+                    f"({elapsed:.1f}s)"
+                )
+                submit_next()
+
+        summary = (
+            f"{stats['events']} events, {stats['rules']} rules, {stats['rows']} dates"
+        )
+        if dry_run:
+            self.stdout.write(
+                f"{summary}: {stats['added']} to add, {stats['removed']} to remove."
+            )
+        else:
+            events_version.bump()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{summary}: {stats['added']} added, {stats['removed']} removed."
+                )
+            )
+
+    def process_chunk(self, chunk, rules, dates, until, stats, dry_run):
+        existing = {}
+        for event_id, d in EventDateInstance.objects.filter(
+            event_id__in=chunk
+        ).values_list("event_id", "date"):
+            existing.setdefault(event_id, set()).add(d)
+
+        for event_id in chunk:
+            wanted = dates.get(event_id, set())
+            current = existing.get(event_id, set())
+            stats["added"] += len(wanted - current)
+            stats["removed"] += len(current - wanted)
+            stats["rows"] += len(wanted)
+        stats["events"] += len(chunk)
+        stats["rules"] += len(rules)
+
+        if dry_run:
+            return
+
+        rules_by_event = {}
+        for rule in rules:
+            rules_by_event.setdefault(rule[0], []).append(
+                EventDate(**dict(zip(RULE_FIELDS, rule)))
+            )
+        events = [
+            Event(
+                pk=event_id,
+                occurrence_fingerprint=get_rules_fingerprint(
+                    rules_by_event.get(event_id, [])
+                ),
+                occurrences_materialised_until=until,
+            )
+            for event_id in chunk
+        ]
+
+        rows = [
+            (event_id, d)
+            for event_id in chunk
+            for d in sorted(dates.get(event_id, ()))
+        ]
+
+        with transaction.atomic():
+            EventDateInstance.objects.filter(event_id__in=chunk).delete()
+            _write_rows(rows)
+            Event.objects.bulk_update(
+                events,
+                ["occurrence_fingerprint", "occurrences_materialised_until"],
+                batch_size=OCCURRENCE_BATCH_SIZE,
+            )
+            if read_model_enabled():
+                sync_read_model(chunk)
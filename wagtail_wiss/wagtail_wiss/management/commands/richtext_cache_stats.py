@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from wagtail_wiss.shared_utils import render_cache
+
+
+class Command(BaseCommand):
+    help = "Show the hit/miss counters of the accessible rich text render cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after printing them.",
+        )
+
+    def handle(self, *args, **options):
+        stats = render_cache.get_stats()
+        if not stats:
+            self.stdout.write("The rich text render cache is disabled (WISS_RICHTEXT_CACHE).")
+            return
+
+        self.stdout.write(f"Hits:      {stats['hits']}")
+        self.stdout.write(f"Misses:    {stats['misses']}")
+        self.stdout.write(f"Evictions: {stats['evictions']}")
+        self.stdout.write(f"Hit ratio: {stats['hit_ratio']:.1%}")
+
+        if options["reset"]:
+            render_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
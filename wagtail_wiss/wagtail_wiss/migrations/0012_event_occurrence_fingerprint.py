@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_wiss', '0011_prerenderedrichtext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='occurrence_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_wiss', '0012_event_occurrence_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='occurrences_materialised_until',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventdate',
+            name='open_ended',
+            field=models.BooleanField(default=False, help_text='Keep repeating with no end date. Ignored when an end date is set.'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_wiss', '0013_event_occurrence_horizon'),
+        ('wagtailcore', '0094_alter_page_locale'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('archive', models.BooleanField(default=False)),
+                ('category_ids', models.JSONField(default=list)),
+                ('area_keys', models.JSONField(default=list)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='wagtail_wiss.event')),
+                ('locale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.locale')),
+            ],
+            options={
+                'verbose_name': 'Event occurrence',
+                'verbose_name_plural': 'Event occurrences',
+                'indexes': [models.Index(fields=['locale', 'archive', 'date'], name='wagtail_wis_locale__3697bf_idx')],
+                'unique_together': {('event', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:03
+
+from django.db import migrations, models
+
+
+def parse_geolocation(geo_str):
+    # A copy of Event.parse_geolocation_string as it was when this migration was written
+    if not geo_str or "POINT(" not in geo_str:
+        return None, None
+    try:
+        point_str = geo_str.split("POINT(")[-1].rstrip(")")
+        lon_str, lat_str = point_str.split()
+        return float(lat_str), float(lon_str)
+    except ValueError:
+        return None, None
+
+
+def backfill_lat_lng(apps, schema_editor):
+    Event = apps.get_model("wagtail_wiss", "Event")
+    events = []
+    for event in (
+        Event.objects.exclude(geolocation__isnull=True)
+        .exclude(geolocation="")
+        .only("pk", "geolocation")
+        .iterator(chunk_size=1000)
+    ):
+        event.lat, event.lng = parse_geolocation(event.geolocation)
+        events.append(event)
+        if len(events) >= 1000:
+            Event.objects.bulk_update(events, ["lat", "lng"])
+            events = []
+    Event.objects.bulk_update(events, ["lat", "lng"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_wiss', '0014_eventoccurrence'),
+        ('wagtailcore', '0094_alter_page_locale'),
+        ('wagtailimages', '0027_image_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['lat', 'lng'], name='wagtail_wis_lat_c3f5bb_idx'),
+        ),
+        migrations.RunPython(backfill_lat_lng, migrations.RunPython.noop),
+    ]
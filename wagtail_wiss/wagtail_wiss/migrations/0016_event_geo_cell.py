@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:07
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def get_cell(lat, lng, size):
+    # A copy of events.geo.get_cell as it was when this migration was written
+    rows, columns = math.ceil(180 / size), math.ceil(360 / size)
+    row = min(max(math.floor((lat + 90) / size), 0), rows - 1)
+    column = min(max(math.floor((lng + 180) / size), 0), columns - 1)
+    return row * columns + column
+
+
+def backfill_geo_cell(apps, schema_editor):
+    Event = apps.get_model("wagtail_wiss", "Event")
+    size = getattr(settings, "WISS_EVENT_GEO_CELL_DEGREES", 0.1)
+    events = []
+    for event in (
+        Event.objects.filter(lat__isnull=False, lng__isnull=False)
+        .only("pk", "lat", "lng")
+        .iterator(chunk_size=1000)
+    ):
+        event.geo_cell = get_cell(event.lat, event.lng, size)
+        events.append(event)
+        if len(events) >= 1000:
+            Event.objects.bulk_update(events, ["geo_cell"])
+            events = []
+    Event.objects.bulk_update(events, ["geo_cell"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_wiss', '0015_event_lat_lng'),
+        ('wagtailcore', '0094_alter_page_locale'),
+        ('wagtailimages', '0027_image_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['locale', 'geo_cell'], name='wagtail_wis_locale__eb6cb7_idx'),
+        ),
+        migrations.RunPython(backfill_geo_cell, migrations.RunPython.noop),
+    ]
@@ -101,6 +101,30 @@ class DefaultPage(Page):
         abstract = True  # This is an abstract base class for default pages and prevents the creation of a DefaultPage model in the database.
 
 
+class PrerenderedRichText(models.Model):
+    """
+    Accessible rich text output computed when a page is published.
 
+    When `WISS_PRERENDER_RICHTEXT` is enabled, `AccessibleRichTextBlock.render` emits
+    the stored HTML instead of parsing and annotating the rich text on every view.
 
+    Attributes:
+        page (ForeignKey): The page the rich text belongs to.
+        digest (CharField): A hash of the rich text source and the page's locale.
+        html (TextField): The rendered HTML with file-type markers and link targets applied.
+    """
+
+    page = models.ForeignKey(
+        "wagtailcore.Page", on_delete=models.CASCADE, related_name="+"
+    )
+    digest = models.CharField(max_length=64)
+    html = models.TextField()
+
+    class Meta:
+        unique_together = ("page", "digest")
+        verbose_name = "Pre-rendered rich text"
+        verbose_name_plural = "Pre-rendered rich text"
+
+    def __str__(self):
+        return f"{self.page_id} - {self.digest[:12]}"
 
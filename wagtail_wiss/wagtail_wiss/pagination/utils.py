@@ -1,4 +1,12 @@
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+CURSOR_SALT = "wagtail_wiss.pagination.cursor"
+
 
 def paginate(request, object_list, per_page=10):
     paginator = Paginator(object_list, per_page)
@@ -11,4 +19,241 @@ def paginate(request, object_list, per_page=10):
     except EmptyPage:
         objects = paginator.page(paginator.num_pages)
 
-    return objects
\ No newline at end of file
+    return objects
+
+
+class _CursorSerializer(signing.JSONSerializer):
+    # Dates and decimals are common sort keys; the default serializer rejects them
+    def dumps(self, obj):
+        return DjangoJSONEncoder(separators=(",", ":")).encode(obj).encode("latin-1")
+
+
+def encode_cursor(direction, values):
+    """
+    Encode a page boundary as an opaque, signed, URL-safe token.
+    """
+    return signing.dumps(
+        [direction, list(values)], salt=CURSOR_SALT, serializer=_CursorSerializer
+    )
+
+
+def decode_cursor(token):
+    """
+    Decode a token from `encode_cursor`, returning (direction, values) or None if it
+    is invalid or was not signed by this site.
+    """
+    if not token:
+        return None
+    try:
+        direction, values = signing.loads(
+            token, salt=CURSOR_SALT, serializer=_CursorSerializer
+        )
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    if direction not in ("next", "prev"):
+        return None
+    if not isinstance(values, list) or len(values) != 2:
+        return None
+    return direction, values
+
+
+def _get_key_field(queryset, key):
+    if key in queryset.query.annotations:
+        return queryset.query.annotations[key].output_field
+    try:
+        return queryset.model._meta.get_field(key)
+    except FieldDoesNotExist:
+        return None
+
+
+def _coerce_cursor_values(queryset, key, values):
+    """
+    Convert the decoded `(key value, pk)` back to Python values of the right types,
+    raising ValidationError if they do not fit the fields.
+    """
+    value, pk = values
+    field = _get_key_field(queryset, key)
+    if value is not None and field is not None:
+        value = field.to_python(value)
+    if pk is None:
+        raise ValidationError("Missing primary key")
+    return value, queryset.model._meta.pk.to_python(pk)
+
+
+def get_approximate_count(queryset, cache_key, timeout=300):
+    """
+    Return the number of rows in `queryset`, cached under `cache_key` for `timeout` seconds.
+
+    The count may lag behind the data by up to `timeout`; it is only meant for
+    "about N results" displays.
+    """
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, timeout)
+    return count
+
+
+class KeysetPage:
+    """
+    One page of a keyset (seek) paginated queryset.
+
+    Attributes:
+        object_list (list): The items on the page.
+        has_next (bool): Whether there are items after this page.
+        has_previous (bool): Whether there are items before this page.
+        next_cursor (str): Token for the following page, or None.
+        previous_cursor (str): Token for the preceding page, or None.
+        approximate_count (int): The cached total, when requested, or None.
+
+    Methods:
+        next_url(), previous_url():
+            Return the current query string with the cursor parameter swapped for the
+            following or preceding page's token.
+    """
+
+    def __init__(
+        self,
+        object_list,
+        has_next,
+        has_previous,
+        next_cursor,
+        previous_cursor,
+        request,
+        cursor_param,
+        approximate_count=None,
+    ):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_count = approximate_count
+        self.request = request
+        self.cursor_param = cursor_param
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _url_for(self, cursor):
+        params = self.request.GET.copy()
+        params.pop("page", None)
+        params[self.cursor_param] = cursor
+        return f"?{params.urlencode()}"
+
+    def next_url(self):
+        return self._url_for(self.next_cursor) if self.has_next else None
+
+    def previous_url(self):
+        return self._url_for(self.previous_cursor) if self.has_previous else None
+
+
+def _seek_filter(key, value, pk, direction):
+    """
+    Build the filter for rows after (or before) `(value, pk)`, in the order
+    `key ASC NULLS LAST, pk ASC`.
+    """
+    if direction == "next":
+        if value is None:
+            return Q(**{f"{key}__isnull": True, "pk__gt": pk})
+        return (
+            Q(**{f"{key}__gt": value})
+            | Q(**{key: value, "pk__gt": pk})
+            | Q(**{f"{key}__isnull": True})
+        )
+
+    if value is None:
+        return Q(**{f"{key}__isnull": False}) | Q(
+            **{f"{key}__isnull": True, "pk__lt": pk}
+        )
+    return Q(**{f"{key}__lt": value}) | Q(**{key: value, "pk__lt": pk})
+
+
+def keyset_paginate(
+    request,
+    queryset,
+    key,
+    per_page=10,
+    cursor_param="cursor",
+    count_cache_key=None,
+    count_timeout=300,
+):
+    """
+    Paginate `queryset` by seeking past the last row seen instead of using OFFSET.
+
+    Rows are ordered by `key` ascending with NULLs last, then by primary key, and each
+    page is fetched with a WHERE clause on those two values, so deep pages cost the same
+    as the first and no COUNT(*) is needed. `key` may be a nullable field or annotation.
+
+    Args:
+        request (HttpRequest): The request carrying the cursor token.
+        queryset (QuerySet): The rows to paginate; its ordering is replaced.
+        key (str): The field or annotation to order by, before the primary key.
+        per_page (int): The number of rows per page.
+        cursor_param (str): The query string parameter holding the token.
+        count_cache_key (str): When given, an approximate total is cached under this key
+            (one per filter combination) and exposed as `approximate_count`.
+        count_timeout (int): How long the approximate total is cached for, in seconds.
+
+    Returns:
+        KeysetPage: The requested page.
+    """
+    cursor = decode_cursor(request.GET.get(cursor_param))
+    if cursor:
+        # Anything that does not fit the fields starts again from the first page
+        try:
+            cursor = cursor[0], _coerce_cursor_values(queryset, key, cursor[1])
+        except (ValidationError, ValueError, TypeError):
+            cursor = None
+
+    rows = None
+    if cursor and cursor[0] == "prev":
+        value, pk = cursor[1]
+        rows = list(
+            queryset.filter(_seek_filter(key, value, pk, "prev")).order_by(
+                F(key).desc(nulls_first=True), "-pk"
+            )[: per_page + 1]
+        )
+        if len(rows) > per_page:
+            rows = rows[:per_page][::-1]
+            has_previous = has_next = True
+        else:
+            # Back at the start: show a full first page rather than a short one
+            cursor = rows = None
+
+    if rows is None:
+        page_queryset = queryset
+        if cursor:
+            value, pk = cursor[1]
+            page_queryset = queryset.filter(_seek_filter(key, value, pk, "next"))
+        rows = list(
+            page_queryset.order_by(F(key).asc(nulls_last=True), "pk")[: per_page + 1]
+        )
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = cursor is not None
+
+    next_cursor = previous_cursor = None
+    if rows:
+        next_cursor = encode_cursor("next", [getattr(rows[-1], key), rows[-1].pk])
+        previous_cursor = encode_cursor("prev", [getattr(rows[0], key), rows[0].pk])
+
+    approximate_count = None
+    if count_cache_key:
+        approximate_count = get_approximate_count(
+            queryset, count_cache_key, count_timeout
+        )
+
+    return KeysetPage(
+        rows,
+        has_next,
+        has_previous,
+        next_cursor,
+        previous_cursor,
+        request,
+        cursor_param,
+        approximate_count,
+    )
@@ -1,14 +1,344 @@
-from bs4 import BeautifulSoup
+import functools
+import re
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
 
+from django.conf import settings
+from django.urls import NoReverseMatch, reverse
 from django.utils.safestring import mark_safe
 
 from wagtail.blocks import RichTextBlock
 from wagtail.documents import get_document_model
+from wagtail.models import Site
 
+from . import prerender, render_cache
 from .doc_helpers import get_file_marker_html
 
 IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
 
+# Elements that never have an end tag
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+    "source", "track", "wbr",
+}
+
+# Stand-ins reversed into the `wagtaildocs_serve` URL to find where its parts go
+_SERVE_ID_PLACEHOLDER = 987654321
+_SERVE_FILENAME_PLACEHOLDER = "wiss-document-filename"
+
+
+@functools.lru_cache(maxsize=None)
+def get_document_serve_re():
+    """
+    Return a regex matching the path of a `wagtaildocs_serve` URL and capturing the
+    document id, built from the URLconf so a project's own prefix is honoured. None
+    when the view is not routed.
+    """
+    try:
+        path = reverse(
+            "wagtaildocs_serve",
+            args=(_SERVE_ID_PLACEHOLDER, _SERVE_FILENAME_PLACEHOLDER),
+        )
+    except NoReverseMatch:
+        return None
+    pattern = (
+        re.escape(path)
+        .replace(str(_SERVE_ID_PLACEHOLDER), r"(\d+)")
+        .replace(re.escape(_SERVE_FILENAME_PLACEHOLDER), r"[^/]+")
+    )
+    return re.compile(f"^{pattern}/?$")
+
+
+def get_site_hosts():
+    """
+    Return the `host[:port]` of every Wagtail site, from Wagtail's cached site list.
+    """
+    return {urlsplit(root.root_url).netloc for root in Site.get_site_root_paths()}
+
+
+def get_local_path(href, site_hosts):
+    """
+    Return the path of `href` if it points at this site: relative, or absolute with the
+    host of one of the sites. Otherwise None.
+
+    Args:
+        site_hosts (callable): Returns the hosts of the sites; only called for
+            absolute URLs.
+    """
+    parts = urlsplit(href)
+    if parts.scheme and parts.scheme not in ("http", "https"):
+        return None
+    if parts.netloc and parts.netloc not in site_hosts():
+        return None
+    return parts.path
+
+
+def get_storage_name(href, path):
+    """
+    Return the storage name a direct file URL refers to, e.g. "documents/report.pdf"
+    for "/media/documents/report.pdf", or None if it is not under `MEDIA_URL`.
+    """
+    media_url = getattr(settings, "MEDIA_URL", "") or ""
+    if not media_url:
+        return None
+    if urlsplit(media_url).netloc:
+        # Files served from another host, e.g. a CDN
+        target = href.split("?")[0].split("#")[0]
+    else:
+        target = path
+    if target and target.startswith(media_url) and len(target) > len(media_url):
+        return unquote(target[len(media_url) :])
+    return None
+
+
+def resolve_documents(hrefs):
+    """
+    Resolve a collection of link hrefs to Wagtail documents.
+
+    Serve URLs (see `get_document_serve_re`), the form rich text gives document links,
+    are matched on the primary key. Direct file URLs under `MEDIA_URL` are matched on
+    the `file` field with a second query, made only when there are such links. Only
+    links to this site are considered, so an external URL shaped like a serve URL is
+    never taken for a local document.
+
+    Args:
+        hrefs (iterable): The href values taken from the rendered anchors.
+
+    Returns:
+        dict: A mapping of href to Document for every href that resolved. Hrefs
+        that do not point to a document are omitted.
+    """
+    serve_re = get_document_serve_re()
+    site_hosts = functools.lru_cache(maxsize=None)(get_site_hosts)
+
+    ids_by_href = {}
+    names_by_href = {}
+    for href in set(hrefs):
+        path = get_local_path(href, site_hosts)
+        if path is None:
+            continue
+        match = serve_re.match(path) if serve_re else None
+        if match:
+            ids_by_href[href] = int(match.group(1))
+            continue
+        name = get_storage_name(href, path)
+        if name:
+            names_by_href[href] = name
+
+    Document = get_document_model()
+    resolved = {}
+    if ids_by_href:
+        by_id = Document.objects.in_bulk(set(ids_by_href.values()))
+        resolved.update(
+            (href, by_id[doc_id])
+            for href, doc_id in ids_by_href.items()
+            if doc_id in by_id
+        )
+    if names_by_href:
+        by_name = {
+            doc.file.name: doc
+            for doc in Document.objects.filter(file__in=set(names_by_href.values()))
+        }
+        resolved.update(
+            (href, by_name[name])
+            for href, name in names_by_href.items()
+            if name in by_name
+        )
+    return resolved
+
+
+class AnchorRewriter(HTMLParser):
+    """
+    A streaming rewriter built on the `html.parser` event stream.
+
+    Everything except `<a>` start and end tags is copied to the output buffer as it
+    was read. Anchor tags are left as slots in the buffer and filled in by
+    `rewrite()` once every href in the fragment has been resolved, so the document
+    lookups happen once per fragment and no tree is ever built.
+
+    An end tag also closes anything left open inside its element, and whatever is
+    still open at the end of the fragment is closed there, as BeautifulSoup did. An
+    unclosed anchor therefore gets its marker inside the paragraph it started in.
+    Stray end tags are dropped.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.buffer = []
+        self.anchors = []
+        self._open_anchors = []
+        self._open_tags = []
+
+    # Anchor tags
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in VOID_ELEMENTS:
+            self._open_tags.append(tag)
+        if tag != "a":
+            self.buffer.append(self.get_starttag_text())
+            return
+
+        anchor = {
+            "attrs": attrs,
+            "raw": self.get_starttag_text(),
+            "start": len(self.buffer),
+            "end": None,
+        }
+        self.buffer.append(None)
+        self.anchors.append(anchor)
+        self._open_anchors.append(anchor)
+
+    def handle_endtag(self, tag):
+        if tag not in self._open_tags:
+            # A stray end tag closes nothing; drop it, as a browser would
+            return
+        # Elements and anchors left open inside this one end with it
+        while True:
+            open_tag = self._open_tags.pop()
+            self._close_element(open_tag)
+            if open_tag == tag:
+                break
+
+    def _close_element(self, tag):
+        if tag == "a":
+            # The slot is filled in by `rewrite()`
+            self._open_anchors.pop()["end"] = len(self.buffer)
+            self.buffer.append(None)
+        else:
+            self.buffer.append(f"</{tag}>")
+
+    # Everything else is passed through untouched
+
+    def handle_startendtag(self, tag, attrs):
+        self.buffer.append(self.get_starttag_text())
+
+    def handle_data(self, data):
+        self.buffer.append(data)
+
+    def handle_entityref(self, name):
+        self.buffer.append(f"&{name};")
+
+    def handle_charref(self, name):
+        self.buffer.append(f"&#{name};")
+
+    def handle_comment(self, data):
+        self.buffer.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self.buffer.append(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self.buffer.append(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self.buffer.append(f"<![{data}]>")
+
+    def close(self):
+        super().close()
+        # Whatever is still open ends with the fragment
+        while self._open_tags:
+            self._close_element(self._open_tags.pop())
+
+    def hrefs(self):
+        for anchor in self.anchors:
+            href = dict(anchor["attrs"]).get("href")
+            if href is not None:
+                yield href
+
+    def rewrite(self, documents):
+        """
+        Fill in the anchor slots and return the rewritten HTML.
+        """
+        buffer = self.buffer
+
+        for anchor in self.anchors:
+            attrs = anchor["attrs"]
+            href = dict(attrs).get("href")
+            if href is None:
+                buffer[anchor["start"]] = anchor["raw"]
+                buffer[anchor["end"]] = "</a>"
+                continue
+
+            doc = documents.get(href)
+            if doc is not None:
+                marker_html = get_file_marker_html(doc.filename)
+            else:
+                clean_href = href.split("?")[0].split("#")[0]
+                marker_html = get_file_marker_html(clean_href)
+
+            # Every link opens in a new tab
+            attrs = _set_attr(attrs, "target", "_blank")
+            attrs = _set_attr(attrs, "rel", "noopener")
+            buffer[anchor["start"]] = _format_start_tag("a", attrs)
+
+            inner = "".join(
+                chunk
+                for chunk in buffer[anchor["start"] + 1 : anchor["end"]]
+                if chunk is not None
+            )
+            if marker_html and marker_html not in inner:
+                buffer[anchor["end"]] = marker_html + "</a>"
+            else:
+                buffer[anchor["end"]] = "</a>"
+
+        return "".join(buffer)
+
+
+def _set_attr(attrs, name, value):
+    """
+    Replace an attribute in place, or append it if the tag does not have it.
+    """
+    if any(key == name for key, _ in attrs):
+        return [(key, value if key == name else val) for key, val in attrs]
+    return attrs + [(name, value)]
+
+
+def _format_start_tag(tag, attrs):
+    # Attributes are sorted, matching the serialisation BeautifulSoup used to produce
+    parts = [tag]
+    for name, value in sorted(attrs, key=lambda attr: attr[0]):
+        if value is None:
+            parts.append(name)
+            continue
+        value = value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        if '"' not in value:
+            parts.append(f'{name}="{value}"')
+        elif "'" not in value:
+            parts.append(f"{name}='{value}'")
+        else:
+            parts.append(f'{name}="{value.replace(chr(34), "&quot;")}"')
+    return f"<{' '.join(parts)}>"
+
+
+def annotate_links(html):
+    """
+    Append file-type markers to the anchors in an HTML fragment and open them in a new tab.
+
+    Args:
+        html (str): The rendered rich text fragment.
+
+    Returns:
+        tuple: The annotated HTML and the `{href: Document}` mapping used to annotate it.
+    """
+    rewriter = AnchorRewriter()
+    rewriter.feed(str(html))
+    rewriter.close()
+
+    documents = resolve_documents(rewriter.hrefs())
+    return rewriter.rewrite(documents), documents
+
+
+def get_site_id(context):
+    """
+    Return the id of the site a render is for, as page links are written relative to it.
+    """
+    request = (context or {}).get("request")
+    if request is None:
+        return None
+    site = Site.find_for_request(request)
+    return site.pk if site else None
+
+
 class AccessibleRichTextBlock(RichTextBlock):
     """
     A custom RichTextBlock that enhances accessibility by appending markers to links
@@ -17,7 +347,12 @@ class AccessibleRichTextBlock(RichTextBlock):
     This block overrides the `render` method to process the rendered HTML and add
     additional markers to anchor (`<a>`) tags. If the link points to a document in
     the system, it appends a marker based on the document's filename. If the document
-    does not exist, it appends a marker based on the cleaned URL.
+    does not exist, it appends a marker based on the cleaned URL. All hrefs in the
+    fragment are resolved to documents with at most two queries (see
+    `resolve_documents`), so the cost of a render does not grow with the number of
+    links. The annotated output can be cached by content hash, locale and site (see
+    `render_cache`), and when `WISS_PRERENDER_RICHTEXT` is enabled the output stored
+    at publish time is used without parsing anything (see `prerender`).
 
     Methods:
         render(value, context=None):
@@ -25,8 +360,9 @@ class AccessibleRichTextBlock(RichTextBlock):
             accessibility markers, and returns the modified HTML.
 
     Dependencies:
-        - BeautifulSoup: Used for parsing and modifying the HTML content.
-        - get_document_model: Retrieves the document model for querying documents.
+        - AnchorRewriter: Streams the HTML and rewrites only the `<a>` tags.
+        - resolve_documents: Resolves every href in the fragment to documents at once.
+        - render_cache: Caches the annotated HTML and evicts it when a linked document changes.
         - get_file_marker_html: Generates the HTML snippet for the file marker.
         - mark_safe: Marks the modified HTML as safe for rendering.
 
@@ -60,39 +396,31 @@ class AccessibleRichTextBlock(RichTextBlock):
 
     #     return mark_safe(str(soup))
     
-    def render(self, value, context=None):
-        html = super().render(value, context)
-        soup = BeautifulSoup(html, "html.parser")
-
-        Document = get_document_model()
+    def render_annotated(self, value, context=None):
+        """
+        Render the rich text and annotate its links, bypassing any stored output.
 
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
+        Returns:
+            tuple: The annotated HTML and the `{href: Document}` mapping used to annotate it.
+        """
+        return annotate_links(super().render(value, context))
 
-            marker_html = ""
-            try:
-                doc = Document.objects.get(file=href)
-                marker_html = get_file_marker_html(doc.filename)
-
-                # 👉 If it's an image document, set target="_blank"
-                #if doc.filename.lower().endswith(IMAGE_EXTENSIONS):
-                a["target"] = "_blank"
-                a["rel"] = "noopener"
-            except Document.DoesNotExist:
-                clean_href = href.split("?")[0].split("#")[0]
-                marker_html = get_file_marker_html(clean_href)
+    def render(self, value, context=None):
+        source = getattr(value, "source", value)
 
-                # Optional: if URL ends with image ext, do the same
-                #if clean_href.lower().endswith(IMAGE_EXTENSIONS):
-                a["target"] = "_blank"
-                a["rel"] = "noopener"
+        html = prerender.get_prerendered_html(source, context)
+        if html is not None:
+            return mark_safe(html)
 
-            if marker_html and marker_html not in str(a):
-                marker_soup = BeautifulSoup(marker_html, "html.parser")
-                for item in marker_soup.contents:
-                    a.append(item)
+        cache_key = render_cache.make_key(source, site_id=get_site_id(context))
+        html = render_cache.get_rendered(cache_key)
+        if html is None:
+            html, documents = self.render_annotated(value, context)
+            render_cache.set_rendered(
+                cache_key, html, document_ids=[doc.pk for doc in documents.values()]
+            )
 
-        return mark_safe(str(soup))
+        return mark_safe(html)
 
 
 class ParagraphBlock(AccessibleRichTextBlock):
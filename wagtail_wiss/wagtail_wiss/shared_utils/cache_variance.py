@@ -0,0 +1,138 @@
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.utils import timezone, translation
+
+from .stream_helpers import iter_page_block_values
+
+# Namespace for the DOM ids derived from StreamField block ids
+BLOCK_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "wagtail-wiss/blocks")
+
+# Seconds a page body is cached for, unless a block on the page expires sooner
+DEFAULT_PAGE_CACHE_TIMEOUT = 60 * 5
+
+
+def is_deterministic():
+    """
+    Whether blocks should render byte-identical HTML for identical inputs
+    (`WISS_DETERMINISTIC_RENDERING`).
+    """
+    return getattr(settings, "WISS_DETERMINISTIC_RENDERING", False)
+
+
+def stable_dom_id(*parts):
+    """
+    Build a DOM id that is the same on every render for the same inputs.
+    """
+    return str(uuid.uuid5(BLOCK_ID_NAMESPACE, "/".join(str(part) for part in parts)))
+
+
+class CacheVarianceMixin:
+    """
+    Lets a block declare everything its rendered output depends on besides its value.
+
+    Attributes:
+        cache_vary_params (tuple): Query string parameters the block reads from the request.
+        cache_vary_locale (bool): Whether the output depends on the active locale.
+
+    Methods:
+        get_request_params(request):
+            Returns the declared query string parameters from the request. Blocks should
+            read the request only through this method so the declaration stays complete.
+        get_cache_variance(value, request):
+            Returns the inputs a cache key must include for this block.
+        get_cache_expiry(value):
+            Returns the datetime at which the output goes stale on its own, or None.
+    """
+
+    cache_vary_params = ()
+    cache_vary_locale = False
+
+    def get_request_params(self, request):
+        if request is None:
+            return {name: [] for name in self.cache_vary_params}
+        return {name: request.GET.getlist(name) for name in self.cache_vary_params}
+
+    def get_cache_variance(self, value, request=None):
+        inputs = {
+            f"GET:{name}": values
+            for name, values in self.get_request_params(request).items()
+        }
+        if self.cache_vary_locale:
+            inputs["locale"] = translation.get_language()
+        return inputs
+
+    def get_cache_expiry(self, value):
+        return None
+
+
+def _iter_variant_blocks(page):
+    for block, value in iter_page_block_values(page):
+        if isinstance(block, CacheVarianceMixin):
+            yield block, value
+
+
+def get_page_cache_inputs(page, request=None):
+    """
+    Merge the cache-variance inputs declared by every block on a page.
+    """
+    inputs = {}
+    for block, value in _iter_variant_blocks(page):
+        inputs.update(block.get_cache_variance(value, request))
+    return inputs
+
+
+def get_page_cache_expiry(page):
+    """
+    Return the earliest expiry declared by a time-dependent block on the page, or None.
+    """
+    expiries = [
+        expires
+        for expires in (
+            block.get_cache_expiry(value) for block, value in _iter_variant_blocks(page)
+        )
+        if expires is not None
+    ]
+    return min(expiries) if expiries else None
+
+
+def get_page_cache_key(page, request=None, prefix="wiss:page"):
+    """
+    Build a full-page cache key from exactly the inputs the page's blocks declare.
+
+    Query string parameters no block declares (tracking parameters, for example) do
+    not fragment the cache.
+    """
+    inputs = get_page_cache_inputs(page, request)
+    payload = json.dumps(
+        {
+            "page": page.pk,
+            "revision": getattr(page, "live_revision_id", None),
+            "locale": translation.get_language(),
+            "inputs": inputs,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return f"{prefix}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def get_page_cache_timeout(page, default=None):
+    """
+    Return the cache timeout for a page in seconds, shortened to the earliest block expiry.
+
+    `default` falls back to `WISS_PAGE_CACHE_TIMEOUT`.
+    """
+    if default is None:
+        default = getattr(
+            settings, "WISS_PAGE_CACHE_TIMEOUT", DEFAULT_PAGE_CACHE_TIMEOUT
+        )
+
+    expires = get_page_cache_expiry(page)
+    if expires is None:
+        return default
+
+    remaining = int((expires - timezone.now()).total_seconds())
+    return max(0, min(default, remaining))
@@ -0,0 +1,123 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import translation
+
+from wagtail.coreutils import get_supported_content_language_variant
+
+# Seconds a worker trusts its in-process copy before checking the shared version again
+DEFAULT_LOCAL_TTL = 5
+
+# How long a loaded catalogue version is kept in the shared cache
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+
+def get_active_language():
+    """
+    Return the content language code of the active locale, without a database query.
+    """
+    return get_supported_content_language_variant(translation.get_language())
+
+
+class SharedVersion:
+    """
+    A version number held in the shared cache (`WISS_CATALOGUE_CACHE`), for keying
+    caches and validators of data derived from rows that change.
+
+    Attributes:
+        name (str): Identifies the version in cache keys.
+
+    Methods:
+        get_version():
+            Returns the current version, starting at 1.
+        bump():
+            Moves to a new version; call it when the source rows change.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "WISS_CATALOGUE_CACHE", "default")]
+
+    @property
+    def version_key(self):
+        return f"wiss:version:{self.name}"
+
+    def get_version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            self.cache.add(self.version_key, 1, None)
+            version = self.cache.get(self.version_key, 1)
+        return version
+
+    def bump(self):
+        try:
+            self.cache.incr(self.version_key)
+        except ValueError:
+            # No version yet; anything keyed on an earlier one predates it
+            self.cache.set(self.version_key, 2, None)
+
+
+class VersionedCatalogue(SharedVersion):
+    """
+    Small, rarely changing per-locale lookup data, held in every process.
+
+    Each worker keeps the loaded data in a dict. A version number in the shared cache
+    (`WISS_CATALOGUE_CACHE`, the default cache unless set) is bumped on invalidation,
+    and workers compare their copy against it at most every `WISS_CATALOGUE_LOCAL_TTL`
+    seconds, so a change reaches every worker within that time while lookups in
+    between cost a dict access. The loaded data is also stored in the shared cache
+    under the version, so only the first worker to see a new version hits the database.
+
+    Attributes:
+        name (str): Identifies the catalogue in cache keys.
+        loader (callable): Builds the data for a language code from the database.
+
+    Methods:
+        get(language_code=None):
+            Returns the data for the language, defaulting to the active one.
+        invalidate():
+            Discards every worker's copy; call it when the source rows change.
+    """
+
+    def __init__(self, name, loader):
+        super().__init__(name)
+        self.loader = loader
+        self._local = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version_key(self):
+        return f"wiss:catalogue:{self.name}:version"
+
+    def get(self, language_code=None):
+        language_code = language_code or get_active_language()
+        now = time.monotonic()
+        ttl = getattr(settings, "WISS_CATALOGUE_LOCAL_TTL", DEFAULT_LOCAL_TTL)
+
+        entry = self._local.get(language_code)
+        if entry and now - entry[1] < ttl:
+            return entry[2]
+
+        version = self.get_version()
+        if entry and entry[0] == version:
+            data = entry[2]
+        else:
+            data_key = f"wiss:catalogue:{self.name}:{version}:{language_code}"
+            data = self.cache.get(data_key)
+            if data is None:
+                data = self.loader(language_code)
+                self.cache.set(data_key, data, DEFAULT_TIMEOUT)
+
+        with self._lock:
+            self._local[language_code] = (version, now, data)
+        return data
+
+    def invalidate(self):
+        self.bump()
+        with self._lock:
+            self._local.clear()
@@ -1,7 +1,8 @@
-from PIL import Image
-import pytesseract
-
 def extract_text_from_image(image_file):
+    # Imported here so OCR support is only loaded when it is used
+    import pytesseract
+    from PIL import Image
+
     image = Image.open(image_file)
     text = pytesseract.image_to_string(image)
     return text.strip()
@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.urls import NoReverseMatch, reverse
+from django.utils import translation
+
+from . import render_cache
+from .stream_helpers import iter_page_block_values
+
+PAGE_CACHE_ATTR = "_wiss_prerendered_richtext"
+
+
+def is_enabled():
+    return getattr(settings, "WISS_PRERENDER_RICHTEXT", False)
+
+
+def iter_page_rich_text(page):
+    """
+    Yield `(block, value)` for every accessible rich text value in a page's StreamFields.
+
+    This covers paragraphs at any depth: `ParagraphBlock` in stream and column blocks,
+    `StyledRichTextBlock.content` and the paragraphs inside `AccordianItemBlock` bodies.
+    """
+    from .accessibility import AccessibleRichTextBlock
+
+    for block, value in iter_page_block_values(page):
+        if isinstance(block, AccessibleRichTextBlock):
+            yield block, value
+
+
+def prerender_page(page):
+    """
+    Annotate every accessible rich text value on a page and store the output.
+
+    Rows for the page are replaced wholesale, so content that was removed from the
+    page does not linger.
+
+    Returns:
+        int: The number of distinct rich text fragments stored for the page.
+    """
+    from wagtail_wiss.models import PrerenderedRichText
+
+    page = page.specific
+    language_code = page.locale.language_code
+    rows = {}
+
+    with translation.override(language_code):
+        for block, value in iter_page_rich_text(page):
+            source = getattr(value, "source", value)
+            digest = render_cache.make_digest(source, locale=language_code)
+            if digest not in rows:
+                html, _ = block.render_annotated(value, {"page": page})
+                rows[digest] = PrerenderedRichText(page=page, digest=digest, html=html)
+
+    with transaction.atomic():
+        PrerenderedRichText.objects.filter(page=page).delete()
+        PrerenderedRichText.objects.bulk_create(rows.values())
+
+    setattr(page, PAGE_CACHE_ATTR, {digest: row.html for digest, row in rows.items()})
+    return len(rows)
+
+
+def clear_page(page):
+    from wagtail_wiss.models import PrerenderedRichText
+
+    PrerenderedRichText.objects.filter(page_id=page.pk).delete()
+
+
+def clear_pages(exclude_page=None):
+    """
+    Drop the stored output of every page, for when page URLs may have changed.
+
+    Stored output contains the expanded URLs of the pages it links to, so like the
+    render cache it cannot tell which rows are affected. `exclude_page` keeps the rows
+    of a page that has just been prerendered with the new URLs.
+    """
+    from wagtail_wiss.models import PrerenderedRichText
+
+    rows = PrerenderedRichText.objects.all()
+    if exclude_page is not None:
+        rows = rows.exclude(page_id=exclude_page.pk)
+    rows.delete()
+
+
+def clear_document(document):
+    """
+    Drop the stored output that links to a document, by its serve URL or file URL.
+    """
+    from wagtail_wiss.models import PrerenderedRichText
+
+    links = Q()
+    try:
+        # Up to and including the id, so renders made before a file was replaced match
+        serve_url = reverse("wagtaildocs_serve", args=(document.pk, "x"))
+        links |= Q(html__contains=serve_url[:-1])
+    except NoReverseMatch:
+        pass
+    if document.file:
+        try:
+            links |= Q(html__contains=document.file.url)
+        except NotImplementedError:
+            pass
+
+    if links:
+        PrerenderedRichText.objects.filter(links).delete()
+
+
+def get_prerendered_html(source, context):
+    """
+    Return the HTML stored at publish time for `source`, or None.
+
+    Stored output is loaded once per page object with a single query and memoised on
+    the page, so every paragraph after the first costs a dictionary lookup.
+    """
+    if not is_enabled() or not context:
+        return None
+
+    page = context.get("page")
+    if page is None or not getattr(page, "pk", None):
+        return None
+
+    stored = getattr(page, PAGE_CACHE_ATTR, None)
+    if stored is None:
+        from wagtail_wiss.models import PrerenderedRichText
+
+        stored = dict(
+            PrerenderedRichText.objects.filter(page_id=page.pk).values_list(
+                "digest", "html"
+            )
+        )
+        setattr(page, PAGE_CACHE_ATTR, stored)
+
+    # Rows are stored under the page's locale, which may differ from the request's
+    # active language, e.g. "en" for an "en-gb" request
+    language_code = page.locale.language_code
+    return stored.get(render_cache.make_digest(source, locale=language_code))
@@ -0,0 +1,171 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import translation
+
+from .catalogue import SharedVersion
+
+KEY_PREFIX = "wiss:richtext"
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+STAT_NAMES = ("hits", "misses", "evictions")
+
+
+def get_cache():
+    """
+    Return the cache backend used for rendered rich text, or None when disabled.
+
+    The cache is off unless `WISS_RICHTEXT_CACHE` names a backend alias, e.g.
+    "default".
+    """
+    alias = getattr(settings, "WISS_RICHTEXT_CACHE", None)
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def get_timeout():
+    return getattr(settings, "WISS_RICHTEXT_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+class RenderVersion(SharedVersion):
+    """
+    A version number kept in the rich text render cache rather than the catalogue cache.
+    """
+
+    @property
+    def cache(self):
+        return get_cache()
+
+    @property
+    def version_key(self):
+        return f"{KEY_PREFIX}:version:{self.name}"
+
+
+# Bumped when a page is published, unpublished, moved or deleted, since rich text
+# expands page links to their current URLs
+pages_version = RenderVersion("pages")
+
+
+def document_version(document_id):
+    return RenderVersion(f"document:{document_id}")
+
+
+def make_digest(source, locale=None):
+    """
+    Hash a rich text source string together with the given (or active) locale.
+    """
+    locale = locale or translation.get_language() or ""
+    return hashlib.sha256(f"{locale}\0{source}".encode("utf-8")).hexdigest()
+
+
+def make_key(source, locale=None, site_id=None):
+    """
+    Build the cache key for a rich text source string in the given (or active) locale,
+    as rendered for a site. The key changes whenever `pages_version` is bumped.
+    """
+    if get_cache() is None:
+        return None
+    version = pages_version.get_version()
+    return f"{KEY_PREFIX}:{version}:{site_id or 0}:{make_digest(source, locale)}"
+
+
+def _stat_key(name):
+    return f"{KEY_PREFIX}:stats:{name}"
+
+
+def _increment(cache, name, delta=1):
+    key = _stat_key(name)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Counter does not exist yet (or was evicted) – start it
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def get_rendered(key):
+    """
+    Return the cached HTML for `key`, or None on a miss. Hits and misses are counted.
+
+    An entry is stored with the versions of the documents it links to, and one whose
+    documents have changed since counts as an eviction and a miss.
+    """
+    cache = get_cache()
+    if cache is None or key is None:
+        return None
+
+    entry = cache.get(key)
+    if entry is None:
+        _increment(cache, "misses")
+        return None
+
+    html, documents = entry
+    if documents:
+        version_keys = {
+            document_version(document_id).version_key: version
+            for document_id, version in documents.items()
+        }
+        current = cache.get_many(version_keys)
+        if any(current.get(k) != v for k, v in version_keys.items()):
+            cache.delete(key)
+            _increment(cache, "evictions")
+            _increment(cache, "misses")
+            return None
+
+    _increment(cache, "hits")
+    return html
+
+
+def set_rendered(key, html, document_ids=()):
+    """
+    Store rendered HTML with the current versions of the documents it links to, so
+    that saving or deleting one of those documents makes the entry stale.
+    """
+    cache = get_cache()
+    if cache is None or key is None:
+        return
+
+    documents = {
+        document_id: document_version(document_id).get_version()
+        for document_id in set(document_ids)
+    }
+    cache.set(key, (html, documents), get_timeout())
+
+
+def evict_document(document_id):
+    """
+    Make every cached render that links to the given document stale.
+    """
+    if get_cache() is not None:
+        document_version(document_id).bump()
+
+
+def evict_pages():
+    """
+    Make every cached render stale, for when page URLs may have changed.
+    """
+    if get_cache() is not None:
+        pages_version.bump()
+
+
+def get_stats():
+    """
+    Return the shared hit/miss/eviction counters and the hit ratio.
+    """
+    cache = get_cache()
+    if cache is None:
+        return {}
+
+    values = cache.get_many([_stat_key(name) for name in STAT_NAMES])
+    stats = {name: values.get(_stat_key(name), 0) for name in STAT_NAMES}
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_stats():
+    cache = get_cache()
+    if cache is not None:
+        cache.delete_many([_stat_key(name) for name in STAT_NAMES])
@@ -0,0 +1,33 @@
+from wagtail import blocks
+from wagtail.fields import StreamField
+
+
+def iter_block_values(block, value):
+    """
+    Walk a block value depth-first and yield `(block, value)` for it and every descendant.
+
+    Stream, list and struct blocks are descended into; any other block is a leaf.
+    """
+    if value is None:
+        return
+
+    yield block, value
+
+    if isinstance(block, blocks.StreamBlock):
+        for child in value:
+            yield from iter_block_values(child.block, child.value)
+    elif isinstance(block, blocks.ListBlock):
+        for item in value:
+            yield from iter_block_values(block.child_block, item)
+    elif isinstance(block, blocks.StructBlock):
+        for name, child_block in block.child_blocks.items():
+            yield from iter_block_values(child_block, value.get(name))
+
+
+def iter_page_block_values(page):
+    """
+    Yield `(block, value)` for every block in every StreamField on a page.
+    """
+    for field in page._meta.get_fields():
+        if isinstance(field, StreamField):
+            yield from iter_block_values(field.stream_block, getattr(page, field.name))
@@ -1,21 +1,27 @@
+import json
+import os
 import re
+import threading
 from pathlib import Path
 
+from django.conf import settings
 
-def get_class_choices_from_scss(file_path):
-    scss_file = Path(file_path)
-    if not scss_file.exists():
-        return []
+CLASS_PATTERN = re.compile(r"\.([\w\-]+)\s*\{(?:\s*//\s*Display Name:\s*(.+))?")
 
-    with open(scss_file, "r") as f:
-        lines = f.readlines()
+NO_STYLE_CHOICE = ("", "No Style")
 
-    raw_choices = []
 
-    pattern = re.compile(r"\.([\w\-]+)\s*\{(?:\s*//\s*Display Name:\s*(.+))?")
+def parse_scss_classes(lines):
+    """
+    Extract `(class_name, display_name)` pairs from SCSS source lines.
+
+    A class may set its display name with a `// Display Name: ...` comment after the
+    opening brace; otherwise the class name is title-cased.
+    """
+    raw_choices = []
 
     for line in lines:
-        match = pattern.search(line)
+        match = CLASS_PATTERN.search(line)
         if match:
             class_name = match.group(1)
             display_name = (
@@ -25,9 +31,164 @@ def get_class_choices_from_scss(file_path):
             )
             raw_choices.append((class_name, display_name))
 
+    return raw_choices
+
+
+def get_class_choices_from_scss(file_path):
+    scss_file = Path(file_path)
+    if not scss_file.exists():
+        return []
+
+    with open(scss_file, "r") as f:
+        lines = f.readlines()
+
+    raw_choices = parse_scss_classes(lines)
+
     # Sort alphabetically by display name
     sorted_choices = sorted(raw_choices, key=lambda x: x[1])
 
     # Ensure "No Style" is first
-    return [("", "No Style")] + sorted_choices
+    return [NO_STYLE_CHOICE] + sorted_choices
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ScssClassChoiceRegistry:
+    """
+    A registry of named CSS class choice lists, each read from one or more SCSS files.
+
+    Choices are resolved lazily, the first time a form asks for them, and each parsed
+    file is cached against its modification time and size, so edits to the SCSS are
+    picked up without a restart while unchanged files are never read twice.
+
+    Sources are registered in code with `register()` and can be replaced per project
+    with the `WISS_SCSS_CLASS_SOURCES` setting (`{name: [path, ...]}`). When
+    `WISS_SCSS_CLASS_CHOICES_FILE` points at an existing JSON artefact (written by the
+    `compile_scss_class_choices` command) the choices are read from it instead, for
+    images where the SCSS sources are not shipped or the filesystem is read-only.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._parsed = {}
+        self._artefact = (None, None)
+        self._lock = threading.Lock()
+
+    def register(self, name, *paths):
+        self._sources.setdefault(name, [])
+        for path in paths:
+            if path not in self._sources[name]:
+                self._sources[name].append(path)
+
+    def get_names(self):
+        names = list(self._sources)
+        for name in getattr(settings, "WISS_SCSS_CLASS_SOURCES", {}):
+            if name not in names:
+                names.append(name)
+        return names
+
+    def get_sources(self, name):
+        overrides = getattr(settings, "WISS_SCSS_CLASS_SOURCES", {})
+        if name in overrides:
+            return [str(path) for path in overrides[name]]
+        return [
+            str(path() if callable(path) else path)
+            for path in self._sources.get(name, [])
+        ]
+
+    def _parse_file(self, path):
+        signature = _file_signature(path)
+        if signature is None:
+            return []
+
+        with self._lock:
+            cached = self._parsed.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+
+        with open(path, "r") as f:
+            choices = parse_scss_classes(f.readlines())
+
+        with self._lock:
+            self._parsed[path] = (signature, choices)
+        return choices
+
+    def _load_artefact(self):
+        path = getattr(settings, "WISS_SCSS_CLASS_CHOICES_FILE", None)
+        if not path:
+            return None
+
+        signature = _file_signature(path)
+        if signature is None:
+            return None
+
+        with self._lock:
+            cached_signature, data = self._artefact
+            if cached_signature == signature:
+                return data
+
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        with self._lock:
+            self._artefact = (signature, data)
+        return data
+
+    def parse_choices(self, name):
+        """
+        Build the choice list for `name` from its SCSS sources, ignoring any artefact.
+        """
+        raw_choices = []
+        seen = set()
+        for path in self.get_sources(name):
+            for class_name, display_name in self._parse_file(path):
+                if class_name not in seen:
+                    seen.add(class_name)
+                    raw_choices.append((class_name, display_name))
+
+        return [NO_STYLE_CHOICE] + sorted(raw_choices, key=lambda x: x[1])
+
+    def get_choices(self, name):
+        artefact = self._load_artefact()
+        if artefact is not None and name in artefact:
+            return [tuple(choice) for choice in artefact[name]]
+        return self.parse_choices(name)
+
+    def compile(self):
+        """
+        Return every registered choice list, parsed from source, ready to dump as JSON.
+        """
+        return {name: self.parse_choices(name) for name in self.get_names()}
+
+
+def _accessible_colour_palette_path():
+    return os.path.join(
+        settings.BASE_DIR,
+        "home",
+        "static",
+        "css",
+        "components",
+        "_accessible-colour-palette.scss",
+    )
+
+
+scss_class_choices = ScssClassChoiceRegistry()
+scss_class_choices.register("styled_paragraph", _accessible_colour_palette_path)
+
+
+def styled_paragraph_class_choices():
+    """
+    Choices for `StyledRichTextBlock.css_class`, read from the accessible colour palette.
 
+    Passed to the ChoiceBlock as a callable so the SCSS file is only read when a form
+    needs the choices, not when `blocks.py` is imported. The block deconstructs to
+    this function, so migrations made for StreamFields using the block import it by
+    path; keep its name and module.
+    """
+    return scss_class_choices.get_choices("styled_paragraph")
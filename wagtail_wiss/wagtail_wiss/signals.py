@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from wagtail.documents import get_document_model
+from wagtail.models import Page
+from wagtail.signals import page_published, page_unpublished, post_page_move
+
+from .events.catalogues import invalidate_filter_options, label_catalogue
+from .events.feeds import events_version
+from .events.models import Event, EventArea, EventsCategory, Label
+from .events.occurrences import schedule_occurrence_refresh_for_ids
+from .shared_utils import prerender, render_cache
+
+
+@receiver([post_save, post_delete], sender=get_document_model())
+def evict_document_renders(sender, instance, **kwargs):
+    """
+    Drop cached and stored rich text renders that link to a document when it is saved
+    or deleted.
+    """
+    # The primary key is gone from a deleted instance by the time the commit runs
+    document_id = instance.pk
+    transaction.on_commit(lambda: render_cache.evict_document(document_id))
+    prerender.clear_document(instance)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_page_move)
+@receiver(post_delete, sender=Page)
+def evict_page_link_renders(sender, instance, **kwargs):
+    """
+    Drop every cached and stored rich text render when a page's URL may have changed,
+    since renders contain the expanded URLs of the pages they link to.
+    """
+    transaction.on_commit(render_cache.evict_pages)
+
+    # A published page has just been prerendered with the new URLs
+    published = instance if kwargs.get("signal") is page_published else None
+    prerender.clear_pages(exclude_page=published)
+
+
+@receiver([post_save, post_delete], sender=Label)
+def invalidate_labels(sender, instance, **kwargs):
+    """
+    Make every worker reload the label catalogue once the change is visible.
+    """
+    # Bumped before the commit, another worker could cache the old rows as new
+    transaction.on_commit(label_catalogue.invalidate)
+
+
+@receiver([post_save, post_delete], sender=EventArea)
+@receiver([post_save, post_delete], sender=EventsCategory)
+def invalidate_event_filters(sender, instance, **kwargs):
+    """
+    Make every worker reload the area and category index once the change is visible.
+    """
+    transaction.on_commit(invalidate_filter_options)
+
+
+@receiver(post_delete, sender=Event)
+def bump_events_version(sender, instance, **kwargs):
+    """
+    Make cached event feeds and their ETags stale once a deletion is visible.
+
+    A saved event needs no bump here: `Event.save` schedules an occurrence refresh,
+    which bumps the version after writing the event's new dates.
+    """
+    transaction.on_commit(events_version.bump)
+
+
+@receiver(page_published)
+def prerender_published_page(sender, instance, **kwargs):
+    """
+    Store the annotated rich text of a page when it is published.
+    """
+    if prerender.is_enabled():
+        prerender.prerender_page(instance)
+
+
+@receiver(page_unpublished)
+def clear_unpublished_page(sender, instance, **kwargs):
+    prerender.clear_page(instance)
+
+
+@receiver(m2m_changed, sender=Event.categories.through)
+@receiver(m2m_changed, sender=Event.areas.through)
+def refresh_event_filters(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Refresh the events whose categories or areas changed, which keeps the category ids
+    and area keys of the `EventOccurrence` read model current and bumps the events
+    version once that is done.
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            schedule_occurrence_refresh_for_ids([instance.pk])
+        return
+
+    # Changed from the category or area side: pk_set holds event ids, except on
+    # clear, where the events are only known before the rows go
+    if action == "pre_clear":
+        accessor = (
+            "events_categories" if sender is Event.categories.through else "events_areas"
+        )
+        instance._wiss_cleared_event_ids = list(
+            getattr(instance, accessor).values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        schedule_occurrence_refresh_for_ids(
+            getattr(instance, "_wiss_cleared_event_ids", [])
+        )
+    elif action in ("post_add", "post_remove"):
+        schedule_occurrence_refresh_for_ids(pk_set)
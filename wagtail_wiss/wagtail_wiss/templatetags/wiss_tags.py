@@ -1,7 +1,14 @@
 from django import template
+from django.db.models import Q
 from django.utils.safestring import mark_safe
 from django.template.loader import get_template
 
+from wagtail_wiss.events.catalogues import get_labels
+from wagtail_wiss.shared_utils.cache_variance import (
+    get_page_cache_key,
+    get_page_cache_timeout,
+    is_deterministic,
+)
 from wagtail_wiss.snippets.models import Menu, MenuItem
 
 register = template.Library()
@@ -18,6 +25,40 @@ def linebreak_span(value):
     return value
 
 
+@register.simple_tag
+def label(key, default=""):
+    """
+    Output the active locale's label for `key`, from the in-process label catalogue.
+
+    Usage: {% label "start_date" %} or {% label "start_date" "Start date" %}
+    """
+    return get_labels().get(key, default)
+
+
+@register.simple_tag(takes_context=True)
+def page_cache_key(context, page):
+    """
+    Return the cache key for a page's body, built from the inputs its blocks declare,
+    or an empty string when `WISS_DETERMINISTIC_RENDERING` is off and the body may
+    differ between renders.
+
+    Usage: {% page_cache_key page as body_cache_key %}
+    """
+    if not is_deterministic():
+        return ""
+    return get_page_cache_key(page, context.get("request"))
+
+
+@register.simple_tag
+def page_cache_timeout(page):
+    """
+    Return how long a page's body may be cached for, in seconds.
+
+    Usage: {% page_cache_timeout page as body_cache_timeout %}
+    """
+    return get_page_cache_timeout(page)
+
+
 @register.simple_tag(takes_context=True)
 def menu(context, menu_name, template='tags/menus/menu.html', css_class='', aria_label=''):
     try:
@@ -0,0 +1,40 @@
+"""
+The link annotation `AccessibleRichTextBlock.render` performed before the streaming
+rewriter, kept verbatim as the reference for the golden files and the benchmark.
+"""
+
+from bs4 import BeautifulSoup
+
+from wagtail.documents import get_document_model
+
+from wagtail_wiss.shared_utils.doc_helpers import get_file_marker_html
+
+
+def baseline_annotate_links(html):
+    soup = BeautifulSoup(html, "html.parser")
+
+    Document = get_document_model()
+
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+
+        marker_html = ""
+        try:
+            doc = Document.objects.get(file=href)
+            marker_html = get_file_marker_html(doc.filename)
+
+            a["target"] = "_blank"
+            a["rel"] = "noopener"
+        except Document.DoesNotExist:
+            clean_href = href.split("?")[0].split("#")[0]
+            marker_html = get_file_marker_html(clean_href)
+
+            a["target"] = "_blank"
+            a["rel"] = "noopener"
+
+        if marker_html and marker_html not in str(a):
+            marker_soup = BeautifulSoup(marker_html, "html.parser")
+            for item in marker_soup.contents:
+                a.append(item)
+
+    return str(soup)
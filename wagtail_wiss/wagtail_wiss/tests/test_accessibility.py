@@ -0,0 +1,71 @@
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from wagtail.documents import get_document_model
+from wagtail.models import Site
+
+from wagtail_wiss.shared_utils.accessibility import annotate_links, resolve_documents
+
+
+class ResolveDocumentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Document = get_document_model()
+        cls.documents = [
+            Document.objects.create(
+                title=f"Report {i}", file=ContentFile(b"%PDF", name=f"report-{i}.pdf")
+            )
+            for i in range(3)
+        ]
+
+    def test_serve_urls_resolve_in_one_query(self):
+        hrefs = [doc.url for doc in self.documents] + ["/about/"]
+        with self.assertNumQueries(1):
+            resolved = resolve_documents(hrefs)
+
+        self.assertEqual(resolved, {doc.url: doc for doc in self.documents})
+
+    def test_file_urls_resolve_in_one_query(self):
+        hrefs = [doc.file.url for doc in self.documents]
+        with self.assertNumQueries(1):
+            resolved = resolve_documents(hrefs)
+
+        self.assertEqual(resolved, {doc.file.url: doc for doc in self.documents})
+
+    def test_serve_and_file_urls_together(self):
+        serve, direct = self.documents[0], self.documents[1]
+        with self.assertNumQueries(2):
+            resolved = resolve_documents([serve.url, direct.file.url])
+
+        self.assertEqual(resolved, {serve.url: serve, direct.file.url: direct})
+
+    def test_external_links_are_not_local_documents(self):
+        doc = self.documents[0]
+        hrefs = [
+            f"https://other.example/documents/{doc.pk}/{doc.filename}",
+            f"https://other.example{doc.file.url}",
+            "mailto:someone@example.com",
+            "https://example.com/brochure.pdf",
+        ]
+        Site.get_site_root_paths()  # warm the cached list of site hosts
+        with self.assertNumQueries(0):
+            resolved = resolve_documents(hrefs)
+        self.assertEqual(resolved, {})
+
+    def test_same_site_absolute_url_resolves(self):
+        doc = self.documents[0]
+        href = f"http://localhost{doc.url}"
+        self.assertEqual(resolve_documents([href]), {href: doc})
+
+    def test_unknown_document_id_is_omitted(self):
+        self.assertEqual(resolve_documents(["/documents/999999/missing.pdf"]), {})
+
+    def test_annotate_links_queries_once_for_many_links(self):
+        links = "".join(
+            f'<a href="{doc.url}">{doc.title}</a>' for doc in self.documents * 10
+        )
+        with self.assertNumQueries(1):
+            html, documents = annotate_links(f"<p>{links}</p>")
+
+        self.assertEqual(len(documents), len(self.documents))
+        self.assertEqual(html.count("(PDF)"), len(self.documents) * 10)
@@ -0,0 +1,111 @@
+import os
+import re
+import time
+import unittest
+from pathlib import Path
+
+from django.test import TestCase
+
+from wagtail_wiss.shared_utils.accessibility import annotate_links
+
+from .baseline import baseline_annotate_links
+
+# Each <name>.html holds a fragment and <name>.expected.html the output of
+# `baseline_annotate_links`, the BeautifulSoup implementation the rewriter replaced
+GOLDEN_DIR = Path(__file__).parent / "golden" / "anchors"
+
+# Set to run the benchmark against the BeautifulSoup implementation
+BENCHMARK = os.environ.get("WISS_BENCHMARK")
+
+# The BeautifulSoup implementation moved nodes out of the marker while iterating over
+# them, so it only ever appended the visible label and dropped the screen reader text
+SR_ONLY_RE = re.compile(r'<span class="sr-only">[^<]*</span>')
+VISIBLE_MARKER_RE = re.compile(r'<span class="small"> \(([^)]+)\)</span>')
+
+
+def golden_sources():
+    return [
+        path
+        for path in sorted(GOLDEN_DIR.glob("*.html"))
+        if not path.name.endswith(".expected.html")
+    ]
+
+
+class AnchorRewriterGoldenTests(TestCase):
+    def test_matches_baseline_apart_from_screen_reader_text(self):
+        sources = golden_sources()
+        self.assertTrue(sources)
+
+        for source in sources:
+            expected = source.with_name(f"{source.stem}.expected.html").read_text()
+            with self.subTest(source.name):
+                html, _ = annotate_links(source.read_text())
+                self.assertEqual(SR_ONLY_RE.sub("", html), SR_ONLY_RE.sub("", expected))
+
+    def test_golden_files_are_baseline_output(self):
+        for source in golden_sources():
+            expected = source.with_name(f"{source.stem}.expected.html").read_text()
+            with self.subTest(source.name):
+                self.assertEqual(baseline_annotate_links(source.read_text()), expected)
+
+    def test_every_marker_has_screen_reader_text(self):
+        for source in golden_sources():
+            with self.subTest(source.name):
+                html, _ = annotate_links(source.read_text())
+                labels = VISIBLE_MARKER_RE.findall(html)
+                self.assertTrue(labels or "<a" not in html)
+                for label in labels:
+                    self.assertIn(
+                        f'<span class="small"> ({label})</span>'
+                        f'<span class="sr-only">, {label} file</span>',
+                        html,
+                    )
+
+    def test_unclosed_anchor_ends_with_its_paragraph(self):
+        html, _ = annotate_links('<p><a href="/media/a.pdf">a</p><p>b</p>')
+
+        self.assertTrue(html.startswith('<p><a href="/media/a.pdf"'))
+        self.assertTrue(html.endswith("</a></p><p>b</p>"))
+        self.assertEqual(html.count("</a>"), 1)
+
+
+PARAGRAPH = (
+    '<p>Minutes of meeting {i}, with the <a href="/media/documents/minutes-{i}.pdf">'
+    "full minutes</a>, <b>actions</b> &amp; the "
+    '<a href="https://example.com/agenda-{i}.docx?v=2">agenda</a>.</p>'
+)
+
+
+def make_body(size):
+    parts = []
+    length = i = 0
+    while length < size:
+        part = PARAGRAPH.format(i=i)
+        parts.append(part)
+        length += len(part)
+        i += 1
+    return "".join(parts)
+
+
+@unittest.skipUnless(BENCHMARK, "Set WISS_BENCHMARK=1 to run the benchmark")
+class AnchorRewriterBenchmark(TestCase):
+    """
+    Throughput of `annotate_links` against `baseline_annotate_links` on 10 KB,
+    100 KB and 1 MB bodies, document lookups included.
+    """
+
+    def measure(self, function, html):
+        start = time.perf_counter()
+        function(html)
+        return len(html.encode("utf-8")) / (time.perf_counter() - start) / 1_000_000
+
+    def test_compare_with_baseline(self):
+        for size in (10_000, 100_000, 1_000_000):
+            html = make_body(size)
+            rewriter = self.measure(annotate_links, html)
+            baseline = self.measure(baseline_annotate_links, html)
+            print(
+                f"\n{size // 1000} KB: rewriter {rewriter:.2f} MB/s, "
+                f"BeautifulSoup {baseline:.2f} MB/s"
+            )
+            self.assertGreater(rewriter, baseline)
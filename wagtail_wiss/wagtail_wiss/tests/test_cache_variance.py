@@ -0,0 +1,38 @@
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+
+from wagtail.models import Page
+
+TEMPLATE = Template(
+    "{% load wagtail_cache wiss_tags %}"
+    "{% page_cache_key page as body_cache_key %}"
+    "{% if body_cache_key %}"
+    "{% page_cache_timeout page as body_cache_timeout %}"
+    '{% wagtailcache body_cache_timeout "wiss-page-body" body_cache_key %}'
+    "{{ body }}"
+    "{% endwagtailcache %}"
+    "{% else %}{{ body }}{% endif %}"
+)
+
+
+class PageBodyCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Page.get_first_root_node()
+        cls.page = root.add_child(instance=Page(title="About", slug="about"))
+
+    def render(self, body, path="/about/"):
+        request = RequestFactory().get(path)
+        return TEMPLATE.render(
+            Context({"page": self.page, "request": request, "body": body})
+        )
+
+    @override_settings(WISS_DETERMINISTIC_RENDERING=True)
+    def test_body_is_cached_on_the_declared_inputs(self):
+        self.assertEqual(self.render("first"), "first")
+        # No block on the page reads the query string, so it does not vary the key
+        self.assertEqual(self.render("second", "/about/?utm_source=x"), "first")
+
+    def test_body_is_not_cached_without_deterministic_rendering(self):
+        self.assertEqual(self.render("first"), "first")
+        self.assertEqual(self.render("second"), "second")
@@ -0,0 +1,204 @@
+import os
+import random
+import re
+import time
+import unittest
+from datetime import date, timedelta
+
+from django.db.models import Q
+from django.test import TestCase
+
+from wagtail.models import Locale
+
+from wagtail_wiss.events.models import (
+    Event,
+    EventArea,
+    EventDateInstance,
+    EventsCategory,
+)
+
+# Set to run the benchmark against a 50k event, 2M occurrence fixture
+BENCHMARK = os.environ.get("WISS_BENCHMARK")
+
+
+def filter_with_distinct_joins(events, categories, start_date, end_date, areas):
+    """
+    The plan `filter_by_joins` replaced: a join and DISTINCT per filter.
+    """
+    if categories:
+        events = events.filter(categories__in=categories).distinct()
+    if start_date or end_date:
+        dates = Q()
+        if start_date:
+            dates &= Q(date_instances__date__gte=start_date)
+        if end_date:
+            dates &= Q(date_instances__date__lte=end_date)
+        events = events.filter(dates).distinct()
+    if areas:
+        events = events.filter(
+            areas__translation_key__in=[area.translation_key for area in areas]
+        ).distinct()
+    return events
+
+
+def seed_events(locale, count, dates_per_event, seed=0):
+    """
+    Create `count` events with two categories, two areas and `dates_per_event` dates
+    each, three days apart, starting within two years of 2025-01-01.
+    """
+    rng = random.Random(seed)
+    categories = EventsCategory.objects.bulk_create(
+        [EventsCategory(name=f"Category {i}", locale=locale) for i in range(20)]
+    )
+    areas = EventArea.objects.bulk_create(
+        [EventArea(name=f"Area {i}", locale=locale) for i in range(30)]
+    )
+    events = Event.objects.bulk_create(
+        [
+            Event(title=f"Event {i}", locale=locale, archive=i % 10 == 0)
+            for i in range(count)
+        ],
+        batch_size=2000,
+    )
+
+    Categories = Event.categories.through
+    Categories.objects.bulk_create(
+        [
+            Categories(event_id=event.pk, eventscategory_id=category.pk)
+            for event in events
+            for category in rng.sample(categories, 2)
+        ],
+        batch_size=10000,
+    )
+    Areas = Event.areas.through
+    Areas.objects.bulk_create(
+        [
+            Areas(event_id=event.pk, eventarea_id=area.pk)
+            for event in events
+            for area in rng.sample(areas, 2)
+        ],
+        batch_size=10000,
+    )
+
+    first = date(2025, 1, 1)
+    batch = []
+    for event in events:
+        start = first + timedelta(days=rng.randrange(700))
+        batch.extend(
+            EventDateInstance(event_id=event.pk, date=start + timedelta(days=3 * k))
+            for k in range(dates_per_event)
+        )
+        if len(batch) >= 50000:
+            EventDateInstance.objects.bulk_create(batch)
+            batch = []
+    EventDateInstance.objects.bulk_create(batch)
+    return categories, areas
+
+
+class FilterByJoinsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.locale = Locale.get_default()
+        cls.categories, cls.areas = seed_events(cls.locale, 300, 10)
+
+    def get_events(self):
+        return Event.objects.filter(archive=False, locale=self.locale)
+
+    def filter_sets(self):
+        return [
+            (self.categories[:3], None, None, None),
+            (None, date(2025, 6, 1), date(2025, 9, 1), None),
+            (None, date(2026, 1, 1), None, None),
+            (None, None, date(2025, 3, 1), self.areas[:2]),
+            (self.categories[:5], date(2025, 3, 1), date(2025, 12, 1), self.areas[:4]),
+        ]
+
+    def test_matches_distinct_joins(self):
+        for filters in self.filter_sets():
+            with self.subTest(filters=filters):
+                expected = filter_with_distinct_joins(self.get_events(), *filters)
+                actual = Event.filter_by_joins(self.get_events(), *filters)
+                self.assertEqual(
+                    sorted(actual.values_list("pk", flat=True)),
+                    sorted(expected.values_list("pk", flat=True)),
+                )
+
+    def test_no_distinct_or_duplicate_rows(self):
+        events = Event.filter_by_joins(
+            self.get_events(),
+            self.categories,
+            date(2025, 1, 1),
+            date(2027, 1, 1),
+            self.areas,
+        )
+        self.assertNotIn("DISTINCT", str(events.query).upper())
+
+        pks = list(events.values_list("pk", flat=True))
+        self.assertEqual(len(pks), len(set(pks)))
+
+    def test_filters_add_no_queries(self):
+        # The active locale, then the events with all filters in one statement
+        with self.assertNumQueries(2):
+            list(
+                Event.get_filtered_events(
+                    categories=self.categories[:3],
+                    start_date=date(2025, 6, 1),
+                    end_date=date(2025, 9, 1),
+                    areas=self.areas[:5],
+                    use_read_model=False,
+                )
+                .prefetch_related(None)
+                .values_list("pk", "next_occurrence")
+            )
+
+
+def estimated_rows(plan):
+    """
+    Return the row estimate of the top node of a PostgreSQL plan, or None for
+    databases whose EXPLAIN does not give one.
+    """
+    match = re.search(r"rows=(\d+)", plan)
+    return int(match.group(1)) if match else None
+
+
+@unittest.skipUnless(BENCHMARK, "Set WISS_BENCHMARK=1 to run the benchmark")
+class FilterPlanBenchmark(TestCase):
+    """
+    Compares the EXISTS plan with the DISTINCT join plan on 50,000 events with 40
+    dates each, by wall time and by the database's row estimates.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.locale = Locale.get_default()
+        cls.categories, cls.areas = seed_events(cls.locale, 50000, 40)
+
+    def test_compare_plans(self):
+        events = Event.objects.filter(archive=False, locale=self.locale)
+        cases = {
+            "dates": (None, date(2025, 1, 1), date(2027, 1, 1), None),
+            "all filters": (
+                self.categories[:3],
+                date(2025, 6, 1),
+                date(2025, 9, 1),
+                self.areas[:2],
+            ),
+        }
+        for name, filters in cases.items():
+            plans = {
+                "joins + DISTINCT": filter_with_distinct_joins(events, *filters),
+                "EXISTS": Event.filter_by_joins(events, *filters),
+            }
+            results = {}
+            for label, queryset in plans.items():
+                queryset = queryset.values_list("pk", flat=True)
+                start = time.perf_counter()
+                results[label] = sorted(queryset)
+                elapsed = time.perf_counter() - start
+                plan = queryset.explain()
+                print(
+                    f"\n{name} / {label}: {len(results[label])} events in "
+                    f"{elapsed * 1000:.0f} ms, estimated rows {estimated_rows(plan)}"
+                )
+                print(plan)
+            self.assertEqual(results["EXISTS"], results["joins + DISTINCT"])
@@ -0,0 +1,236 @@
+import json
+import math
+import os
+import random
+import time
+import unittest
+
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from wagtail.models import Locale
+
+from wagtail_wiss.events import geo
+from wagtail_wiss.events.blocks import EventsBlock
+from wagtail_wiss.events.models import Event
+from wagtail_wiss.events.views import events_geojson
+
+# Set to run the benchmark over 100,000 geolocated events
+BENCHMARK = os.environ.get("WISS_BENCHMARK")
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in kilometres, computed in Python as a reference.
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def make_events(locale, points):
+    return Event.objects.bulk_create(
+        [
+            Event(
+                title=f"Event {i}",
+                locale=locale,
+                lat=lat,
+                lng=lng,
+                geo_cell=geo.get_cell(lat, lng),
+            )
+            for i, (lat, lng) in enumerate(points)
+        ],
+        batch_size=5000,
+    )
+
+
+def destination(lat, lng, bearing, distance_km):
+    lat, lng, bearing = map(math.radians, (lat, lng, bearing))
+    angle = distance_km / geo.EARTH_RADIUS_KM
+    dest_lat = math.asin(
+        math.sin(lat) * math.cos(angle)
+        + math.cos(lat) * math.sin(angle) * math.cos(bearing)
+    )
+    dest_lng = lng + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat),
+        math.cos(angle) - math.sin(lat) * math.sin(dest_lat),
+    )
+    return math.degrees(dest_lat), (math.degrees(dest_lng) + 540) % 360 - 180
+
+
+class ParseTests(SimpleTestCase):
+    def test_parse_point(self):
+        self.assertEqual(geo.parse_point("51.48,-3.18"), (51.48, -3.18))
+        for value in (None, "", "51.48", "91,0", "0,181", "a,b", "1,2,3"):
+            with self.subTest(value=value):
+                self.assertIsNone(geo.parse_point(value))
+
+    def test_parse_radius(self):
+        self.assertEqual(geo.parse_radius("10"), 10)
+        self.assertEqual(geo.parse_radius("100000"), geo.MAX_RADIUS_KM)
+        for value in (None, "", "-5", "0", "nan", "inf", "x"):
+            with self.subTest(value=value):
+                self.assertEqual(geo.parse_radius(value), geo.DEFAULT_RADIUS_KM)
+
+
+class BoundingBoxTests(SimpleTestCase):
+    def test_box_encloses_circle(self):
+        rng = random.Random(3)
+        for _ in range(500):
+            lat, lng = rng.uniform(-89, 89), rng.uniform(-179, 179)
+            radius = rng.choice((1, 10, 50, 250, 500))
+            south, west, north, east = geo.bounding_box(lat, lng, radius)
+            for bearing in range(0, 360, 5):
+                # The point `radius` km away on this bearing, shrunk a hair for rounding
+                point_lat, point_lng = destination(lat, lng, bearing, radius * 0.9999)
+                with self.subTest(lat=lat, lng=lng, radius=radius, bearing=bearing):
+                    self.assertTrue(south <= point_lat <= north)
+                    if west > -180 or east < 180:
+                        self.assertTrue(west <= point_lng <= east)
+
+    def test_cells_cover_box(self):
+        rng = random.Random(4)
+        for _ in range(200):
+            south, north = sorted(rng.uniform(-80, 80) for _ in range(2))
+            west, east = sorted(rng.uniform(-170, 170) for _ in range(2))
+            ranges = geo.cell_ranges(south, west, north, east)
+            for _ in range(20):
+                cell = geo.get_cell(rng.uniform(south, north), rng.uniform(west, east))
+                self.assertTrue(any(first <= cell <= last for first, last in ranges))
+
+
+class FilterWithinRadiusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.locale = Locale.get_default()
+        rng = random.Random(5)
+        # Clustered around Cardiff, plus some anywhere in the world
+        points = [
+            (51.48 + rng.gauss(0, 0.5), -3.18 + rng.gauss(0, 0.8)) for _ in range(400)
+        ] + [(rng.uniform(-89, 89), rng.uniform(-180, 180)) for _ in range(100)]
+        cls.points = dict(zip((e.pk for e in make_events(cls.locale, points)), points))
+
+    def assertMatchesReference(self, lat, lng, radius):
+        events = geo.filter_within_radius(
+            Event.objects.all(), lat, lng, radius, locale=self.locale
+        )
+        found = dict(events.values_list("pk", "distance"))
+        expected = {
+            pk: haversine(lat, lng, *point)
+            for pk, point in self.points.items()
+            if haversine(lat, lng, *point) <= radius
+        }
+        # Points a hair from the edge may fall either side on rounding
+        borderline = {
+            pk
+            for pk, point in self.points.items()
+            if abs(haversine(lat, lng, *point) - radius) < 1e-6
+        }
+        self.assertEqual(set(found) - borderline, set(expected) - borderline)
+        for pk, distance in found.items():
+            reference = haversine(lat, lng, *self.points[pk])
+            self.assertAlmostEqual(distance, reference, places=6)
+
+    def test_matches_python_haversine(self):
+        for radius in (1, 5, 25, 100, 500):
+            with self.subTest(radius=radius):
+                self.assertMatchesReference(51.48, -3.18, radius)
+
+    def test_near_pole_and_antimeridian(self):
+        for lat, lng in ((88.5, 20), (-88.5, -20), (10, 179.9), (-10, -179.9)):
+            with self.subTest(lat=lat, lng=lng):
+                self.assertMatchesReference(lat, lng, 500)
+
+    def test_sorted_by_distance(self):
+        events = geo.filter_within_radius(
+            Event.objects.all(), 51.48, -3.18, 50, locale=self.locale
+        ).order_by("distance", "pk")
+        distances = list(events.values_list("distance", flat=True))
+        self.assertTrue(distances)
+        self.assertEqual(distances, sorted(distances))
+
+
+@unittest.skipUnless(BENCHMARK, "Set WISS_BENCHMARK=1 to run the benchmark")
+class NearSearchBenchmark(TestCase):
+    """
+    Times a "near me" page over 100,000 geolocated events: the indexed bounding box
+    and database distances against loading every event and sorting in Python.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.locale = Locale.get_default()
+        rng = random.Random(6)
+        # Spread over Great Britain
+        make_events(
+            cls.locale,
+            [(rng.uniform(50, 58.6), rng.uniform(-7.5, 1.7)) for _ in range(100000)],
+        )
+
+    def test_compare_with_python(self):
+        lat, lng = 51.48, -3.18
+        for radius in (5, 25, 100):
+            start = time.perf_counter()
+            page = list(
+                geo.filter_within_radius(
+                    Event.objects.all(), lat, lng, radius, locale=self.locale
+                )
+                .order_by("distance", "pk")
+                .values_list("pk", flat=True)[:20]
+            )
+            indexed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            distances = [
+                (haversine(lat, lng, event_lat, event_lng), pk)
+                for pk, event_lat, event_lng in Event.objects.filter(
+                    locale=self.locale
+                ).values_list("pk", "lat", "lng")
+            ]
+            python_page = [
+                pk for distance, pk in sorted(distances) if distance <= radius
+            ][:20]
+            in_python = time.perf_counter() - start
+
+            print(
+                f"\n{radius} km: indexed {indexed * 1000:.1f} ms, "
+                f"in Python {in_python * 1000:.1f} ms"
+            )
+            self.assertEqual(page, python_page)
+
+
+class GeoJSONNearTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cardiff, cls.london = make_events(
+            Locale.get_default(), [(51.48, -3.18), (51.51, -0.13)]
+        )
+
+    def get_features(self, **params):
+        request = RequestFactory().get(
+            "/events.geojson", {"bbox": "-5,50,1,53", "zoom": "18"} | params
+        )
+        response = events_geojson(request)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.getvalue())["features"]
+
+    def test_near_limits_the_map_to_the_radius(self):
+        features = self.get_features(near="51.48,-3.18", radius="10")
+        self.assertEqual([feature["id"] for feature in features], [self.cardiff.pk])
+
+    def test_near_applies_to_clusters(self):
+        features = self.get_features(zoom="3", near="51.48,-3.18", radius="10")
+        self.assertEqual([feature["id"] for feature in features], [self.cardiff.pk])
+
+    def test_near_is_part_of_the_feed_key(self):
+        self.assertEqual(len(self.get_features()), 2)
+        self.assertEqual(len(self.get_features(near="51.48,-3.18", radius="10")), 1)
+
+    def test_geojson_url_carries_near_and_radius(self):
+        url = EventsBlock.get_geojson_url(
+            "en", [], None, None, [], near=(51.48, -3.18), radius=10
+        )
+        self.assertIn("near=51.48%2C-3.18", url)
+        self.assertIn("radius=10", url)
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+from django.test import SimpleTestCase
+
+# The modules a worker loads at start-up through the app, its hooks and its blocks
+MODULES = (
+    "wagtail_wiss.models",
+    "wagtail_wiss.blocks",
+    "wagtail_wiss.views",
+    "wagtail_wiss.wagtail_hooks",
+    "wagtail_wiss.events.models",
+    "wagtail_wiss.events.blocks",
+    "wagtail_wiss.events.views",
+)
+
+# Only loaded when OCR or rrule expansion is actually used. PIL and requests are not
+# listed: Wagtail loads them itself
+DEFERRED = ("pytesseract", "dateutil.rrule")
+
+# The time spent in this package's own modules; generous, so that only work such as
+# parsing a file at import creeping back in trips it
+BUDGET_MS = 100
+
+
+def measure_imports(modules):
+    """
+    Import `modules` in a fresh interpreter under `python -X importtime`.
+
+    Returns:
+        dict: The time spent importing each module loaded, excluding the modules it
+        imports in turn, in microseconds.
+    """
+    code = "import django; django.setup(); " + "; ".join(
+        f"import {module}" for module in modules
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, _, name = line.split("|")
+        own = own[len("import time:") :].strip()
+        if own.isdigit():
+            timings[name.strip()] = int(own)
+    return timings
+
+
+class ImportTimeTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.timings = measure_imports(MODULES)
+
+    def test_heavy_dependencies_are_not_imported(self):
+        for module in DEFERRED:
+            with self.subTest(module):
+                self.assertNotIn(module, self.timings)
+
+    def test_start_up_cost_stays_within_budget(self):
+        own = {
+            name: microseconds
+            for name, microseconds in self.timings.items()
+            if name.split(".")[0] == "wagtail_wiss"
+        }
+        slowest = ", ".join(
+            f"{name} {own[name] / 1000:.1f} ms"
+            for name in sorted(own, key=own.get, reverse=True)[:5]
+        )
+        self.assertLess(sum(own.values()) / 1000, BUDGET_MS, msg=slowest)
@@ -0,0 +1,25 @@
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+
+from wagtail.models import Page
+
+from wagtail_wiss.snippets.models import Menu, MenuItem
+
+
+class MenuTagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Page.get_first_root_node()
+        cls.page = root.add_child(instance=Page(title="About", slug="about"))
+        menu = Menu.objects.create(name="main")
+        MenuItem.objects.create(menu=menu, page=cls.page, sort_order=0)
+        MenuItem.objects.create(
+            menu=menu, name="Elsewhere", link_url="https://example.com", sort_order=1
+        )
+
+    def test_renders_page_and_url_items(self):
+        html = Template('{% load wiss_tags %}{% menu "main" %}').render(
+            Context({"request": RequestFactory().get("/")})
+        )
+        self.assertIn("About", html)
+        self.assertIn("Elsewhere", html)
@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from wagtail.models import Locale
+
+from wagtail_wiss.events import occurrences
+from wagtail_wiss.events.models import Event
+
+
+class ScheduleOccurrenceRefreshTests(TransactionTestCase):
+    def setUp(self):
+        locale = Locale.objects.get_or_create(language_code="en")[0]
+        self.events = [
+            Event.objects.create(title=f"Event {i}", locale=locale) for i in range(3)
+        ]
+        patcher = mock.patch.object(occurrences, "refresh_occurrences")
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def refreshed(self):
+        return [sorted(call.args[0]) for call in self.refresh.call_args_list]
+
+    def test_one_refresh_per_transaction(self):
+        with transaction.atomic():
+            for event in self.events * 2:
+                occurrences.schedule_occurrence_refresh(event)
+            self.refresh.assert_not_called()
+
+        self.assertEqual(self.refreshed(), [sorted(e.pk for e in self.events)])
+
+    def test_outside_a_transaction_refreshes_immediately(self):
+        occurrences.schedule_occurrence_refresh(self.events[0])
+        self.assertEqual(self.refreshed(), [[self.events[0].pk]])
+
+    def test_rolled_back_ids_are_dropped(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                occurrences.schedule_occurrence_refresh(self.events[0])
+                raise RuntimeError
+
+        with transaction.atomic():
+            occurrences.schedule_occurrence_refresh(self.events[1])
+
+        self.assertEqual(self.refreshed(), [[self.events[1].pk]])
+
+    def test_rolled_back_savepoint_does_not_lose_the_flush(self):
+        with transaction.atomic():
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    occurrences.schedule_occurrence_refresh(self.events[0])
+                    raise RuntimeError
+            occurrences.schedule_occurrence_refresh(self.events[1])
+
+        self.assertEqual(self.refreshed(), [[self.events[1].pk]])
+
+    def test_each_transaction_gets_its_own_flush(self):
+        for event in self.events:
+            with transaction.atomic():
+                occurrences.schedule_occurrence_refresh(event)
+
+        self.assertEqual(self.refreshed(), [[event.pk] for event in self.events])
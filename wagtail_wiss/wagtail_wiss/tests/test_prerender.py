@@ -0,0 +1,59 @@
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import translation
+
+from wagtail.documents import get_document_model
+from wagtail.models import Page
+
+from wagtail_wiss.models import PrerenderedRichText
+from wagtail_wiss.shared_utils import prerender, render_cache
+
+
+@override_settings(WISS_PRERENDER_RICHTEXT=True)
+class PrerenderedRichTextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Page.get_first_root_node()
+        cls.page = root.add_child(instance=Page(title="Reports", slug="reports"))
+        cls.other_page = root.add_child(instance=Page(title="News", slug="news"))
+        cls.document = get_document_model().objects.create(
+            title="Report", file=ContentFile(b"%PDF", name="report.pdf")
+        )
+
+    def store(self, page, source, html):
+        digest = render_cache.make_digest(source, locale=page.locale.language_code)
+        return PrerenderedRichText.objects.create(page=page, digest=digest, html=html)
+
+    def test_lookup_uses_the_page_locale(self):
+        self.store(self.page, "<p>Hello</p>", "<p>Stored</p>")
+        page = Page.objects.get(pk=self.page.pk)
+
+        with translation.override("en-gb"):
+            html = prerender.get_prerendered_html("<p>Hello</p>", {"page": page})
+
+        self.assertEqual(html, "<p>Stored</p>")
+
+    def test_clear_document_drops_rows_linking_to_it(self):
+        serve_url = self.document.url
+        self.store(self.page, "a", f'<a href="{serve_url}">Report</a>')
+        self.store(self.page, "b", f'<a href="{self.document.file.url}">Report</a>')
+        kept = self.store(self.other_page, "c", '<a href="/documents/999/x.pdf">X</a>')
+
+        self.document.save()
+
+        self.assertQuerySetEqual(PrerenderedRichText.objects.all(), [kept])
+
+    def test_publishing_drops_rows_of_other_pages(self):
+        self.store(self.other_page, "b", "<p>News</p>")
+
+        self.page.save_revision().publish()
+
+        self.assertFalse(PrerenderedRichText.objects.exists())
+
+    def test_clear_pages_keeps_the_excluded_page(self):
+        kept = self.store(self.page, "a", "<p>Reports</p>")
+        self.store(self.other_page, "b", "<p>News</p>")
+
+        prerender.clear_pages(exclude_page=self.page)
+
+        self.assertQuerySetEqual(PrerenderedRichText.objects.all(), [kept])
@@ -0,0 +1,88 @@
+import os
+import random
+import timeit
+import unittest
+from datetime import date, timedelta
+
+from dateutil.rrule import rrule
+from django.test import SimpleTestCase
+
+from wagtail_wiss.events import recurrence
+
+BENCHMARK = os.environ.get("WISS_BENCHMARK")
+
+
+def expand_with_rrule(start, until, frequency, interval):
+    if until < start:
+        return []
+    rule = rrule(freq=frequency, dtstart=start, until=until, interval=interval)
+    return [occurrence.date() for occurrence in rule]
+
+
+class ExpandDifferentialTests(SimpleTestCase):
+    """
+    `recurrence.expand` must produce exactly what dateutil.rrule does.
+    """
+
+    FREQUENCIES = (
+        recurrence.YEARLY,
+        recurrence.MONTHLY,
+        recurrence.WEEKLY,
+        recurrence.DAILY,
+    )
+
+    def assertMatchesRrule(self, start, until, frequency, interval):
+        self.assertEqual(
+            recurrence.expand(start, until, frequency, interval),
+            expand_with_rrule(start, until, frequency, interval),
+            msg=f"start={start} until={until} frequency={frequency} interval={interval}",
+        )
+
+    def test_random_rules(self):
+        rng = random.Random(2024)
+        for _ in range(2000):
+            start = date(2000, 1, 1) + timedelta(days=rng.randrange(12000))
+            until = start + timedelta(days=rng.randrange(-5, 1500))
+            self.assertMatchesRrule(
+                start, until, rng.choice(self.FREQUENCIES), rng.randrange(1, 6)
+            )
+
+    def test_days_missing_from_some_months_and_years(self):
+        starts = [
+            date(2023, 1, 31),
+            date(2024, 1, 30),
+            date(2024, 1, 29),
+            date(2024, 2, 29),
+            date(2023, 3, 31),
+            date(2023, 12, 31),
+        ]
+        for start in starts:
+            for frequency in (recurrence.MONTHLY, recurrence.YEARLY):
+                for interval in (1, 2, 3, 5):
+                    with self.subTest(start=start, frequency=frequency, interval=interval):
+                        self.assertMatchesRrule(
+                            start, start + timedelta(days=3000), frequency, interval
+                        )
+
+    def test_until_on_and_before_start(self):
+        start = date(2025, 6, 15)
+        for frequency in self.FREQUENCIES:
+            self.assertMatchesRrule(start, start, frequency, 1)
+            self.assertMatchesRrule(start, start - timedelta(days=1), frequency, 1)
+
+    def test_returns_dates(self):
+        dates = recurrence.expand(date(2025, 1, 1), date(2025, 3, 1), recurrence.WEEKLY)
+        self.assertTrue(all(type(d) is date for d in dates))
+
+
+@unittest.skipUnless(BENCHMARK, "Set WISS_BENCHMARK=1 to run the benchmark")
+class ExpandSpeedTests(SimpleTestCase):
+    def test_multi_year_daily_rule_is_ten_times_faster(self):
+        start, until = date(2025, 1, 1), date(2030, 12, 31)
+
+        def best(function):
+            return min(timeit.repeat(function, number=10, repeat=5))
+
+        rrule_time = best(lambda: expand_with_rrule(start, until, recurrence.DAILY, 1))
+        expand_time = best(lambda: recurrence.expand(start, until, recurrence.DAILY, 1))
+        self.assertGreaterEqual(rrule_time / expand_time, 10)
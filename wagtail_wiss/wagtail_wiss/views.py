@@ -1,8 +1,6 @@
-import pytesseract
-from wagtail.images import get_image_model
-from PIL import Image as PilImage
-import requests
 from io import BytesIO
+
+from wagtail.images import get_image_model
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.admin.views.decorators import staff_member_required
@@ -18,6 +16,11 @@ def run_ocr_on_image(request):
         if not image_id:
             return JsonResponse({'error': 'Missing image_id'}, status=400)
 
+        # OCR and HTTP libraries are only loaded when OCR is actually requested
+        import pytesseract
+        import requests
+        from PIL import Image as PilImage
+
         try:
             ImageModel = get_image_model()
             img_obj = ImageModel.objects.get(id=image_id)
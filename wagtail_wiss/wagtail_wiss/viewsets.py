@@ -1,5 +1,4 @@
 from django.utils.translation import gettext as _
-from django.db import transaction
 from django.forms.widgets import (
     CheckboxSelectMultiple,
 )  # Only for instantiation
@@ -16,6 +15,7 @@ from wagtailgeowidget import geocoders
 from wagtailgeowidget.panels import GeoAddressPanel, LeafletPanel
 
 from wagtail_wiss.events.models import EventsCategory, EventArea, Event
+from wagtail_wiss.events.occurrences import schedule_occurrence_refresh
 
 
 
@@ -180,8 +180,11 @@ class EventViewSet(SnippetViewSet):
     def after_save(self, instance):
         """
         Ensure EventDateInstance table updates after the event and related objects are saved.
+
+        Event.save() has already scheduled the refresh; scheduling again is a no-op
+        within the same transaction.
         """
-        transaction.on_commit(lambda: instance.refresh_event_date_instances())
+        schedule_occurrence_refresh(instance)
         super().after_save(instance)
 
     panels = [